@@ -1,12 +1,130 @@
+from typing import Dict, List, Optional
 from pydantic_settings import BaseSettings
 
 
 class Settings(BaseSettings):
     database_url: str
+    # Optional streaming replica for read-only endpoints (app/db.py
+    # get_read_session); same pool settings as the primary.
+    database_replica_url: Optional[str] = None
+    # Connection pool of app/db.py (per process: the API and each worker).
+    db_pool_size: int = 10
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30.0
+    # Replace connections older than this (seconds, -1 never), before
+    # PgBouncer/the server closes idle ones.
+    db_pool_recycle: int = 1800
+    db_pool_pre_ping: bool = True
+    # Connections opened at startup, before taking traffic (default
+    # db_pool_size, 0 disables).
+    db_pool_warmup: Optional[int] = None
+    # PgBouncer in transaction mode: a session's statements can land on
+    # different server connections, so asyncpg's prepared statement caches
+    # are turned off and statement names made unique.
+    db_pgbouncer: bool = False
+    # Development check (app/explain.py): EXPLAIN every SELECT with seq scans
+    # disabled and log the ones that still scan a table, i.e. have no usable
+    # index. Small reference tables are read whole on purpose.
+    db_explain_seq_scans: bool = False
+    db_explain_allowed_tables: List[str] = ["jenis_belanja", "sub_jenis_belanja", "kro"]
     app_env: str = "production"
     agent_url: str
     agent_api_key: str
     x_api_key: str
+    agent_summary_concurrency: int = 4
+    # Reference document name on the agent -> label stored on map priority.
+    map_priority_documents: Dict[str, str] = {
+        "apr-spbe.md": "ARSITEKTUR DAN PETA RENCANA SPBE",
+        "renja.md": "RENCANA KERJA",
+        "renstra.md": "RENCANA STRATEGIS",
+        "tusi.md": "TUGAS DAN FUNGSI",
+    }
+    # Shared agent HTTP client (src/agent/client.py)
+    agent_max_connections: int = 20
+    agent_max_keepalive_connections: int = 10
+    agent_keepalive_expiry: float = 30.0
+    agent_http2: bool = False
+    agent_connect_timeout: float = 10.0
+    agent_read_timeout: float = 240.0
+    agent_write_timeout: float = 60.0
+    agent_pool_timeout: float = 60.0
+    # Adaptive concurrency limit and circuit breaker (src/agent/limiter.py)
+    agent_limiter_initial: int = 8
+    agent_limiter_min: int = 1
+    agent_limiter_max: int = 20
+    agent_limiter_latency_tolerance: float = 2.0
+    agent_limiter_backoff: float = 0.7
+    agent_limiter_cooldown: float = 5.0
+    agent_circuit_failure_threshold: int = 5
+    agent_circuit_reset_seconds: float = 30.0
+    # Size of the base64 slices streamed from the blob store into agent
+    # requests (src/agent/body.py)
+    agent_body_chunk_size: int = 512 * 1024
+    # Content-addressed cache of agent responses (src/agent/cache.py)
+    agent_cache_enabled: bool = True
+    agent_cache_ttl_seconds: int = 7 * 24 * 3600
+    agent_cache_memory_max_bytes: int = 64 * 1024 * 1024
+    agent_cache_db_max_bytes: int = 2 * 1024 * 1024 * 1024
+    # Document storage (src/storage/blob.py). With BLOB_ACCEL_REDIRECT_PREFIX
+    # set, downloads are handed to nginx (X-Accel-Redirect to
+    # <prefix>/<ab/cd/sha256>) instead of being sent by the app.
+    # BLOB_STORE_PATH must be a volume shared by the API and every worker
+    # node: the API stores the uploads that workers read.
+    blob_store_backend: str = "local"
+    blob_store_path: str = "storage/blobs"
+    blob_chunk_size: int = 1024 * 1024
+    blob_accel_redirect_prefix: Optional[str] = None
+    # Downloads carry the content hash as ETag; "no-cache" lets browsers and
+    # proxies keep a copy but revalidate it (304) on every use.
+    blob_cache_control: str = "no-cache"
+    # Workers delete blobs no row references (rejected or failed uploads)
+    # every BLOB_SWEEP_INTERVAL_SECONDS (0 disables), once they are older
+    # than BLOB_SWEEP_GRACE_SECONDS.
+    blob_sweep_interval_seconds: int = 6 * 3600
+    blob_sweep_grace_seconds: int = 24 * 3600
+    # In-memory KRO / jenis belanja cache (src/reference/cache.py).
+    reference_cache_ttl_seconds: int = 3600
+    reference_cache_control: str = "no-cache"
+    # Cache-Control of the artifacts of a completed proposal (ETag: job id and
+    # artifact version); revalidated, so a note edit shows up at once.
+    artifact_cache_control: str = "private, no-cache"
+    # Response compression (src/middleware/compression_middleware.py), by
+    # server preference; br and zstd need the `compression` extra.
+    compression_encodings: List[str] = ["zstd", "br", "gzip"]
+    compression_minimum_size: int = 1024
+    compression_media_types: List[str] = [
+        "application/json",
+        "text/plain",
+        "text/html",
+        "text/markdown",
+        "text/csv",
+    ]
+    compression_gzip_level: int = 6
+    compression_brotli_quality: int = 5
+    compression_zstd_level: int = 3
+    # Streamed bodies of a known size up to this are compressed in one go
+    # (and can be cached); larger or unknown ones are compressed per chunk.
+    compression_buffer_max_bytes: int = 4 * 1024 * 1024
+    # Compressed copies of ETagged responses, so repeated hits on the same
+    # artifact are not compressed again.
+    compression_cache_max_bytes: int = 32 * 1024 * 1024
+    compression_cache_ttl_seconds: int = 3600
+    # Page size of GET /proposal/ (?limit= up to the max).
+    proposal_list_page_size: int = 50
+    proposal_list_max_page_size: int = 200
+    # Upload caps, enforced while the multipart body is streamed in.
+    upload_max_file_size: int = 50 * 1024 * 1024
+    upload_max_request_size: int = 200 * 1024 * 1024
+    # Worker process (see worker.py)
+    worker_concurrency: int = 2
+    worker_poll_interval: float = 1.0
+    worker_shutdown_timeout: float = 60.0
+    job_lease_seconds: int = 300
+    job_max_attempts: int = 3
+    # Prometheus endpoint of worker.py (0 disables it); the API serves /metrics.
+    worker_metrics_port: int = 9100
+    # Run a worker inside the API process as well (local development).
+    embedded_worker: bool = False
 
     class Config:
         env_file = ".env"
@@ -1,3 +1,10 @@
+import logging
+import time
+from fastapi import Request
+import uuid
+from prometheus_client import Counter, Histogram
+from sqlalchemy import event, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.ext.asyncio import (
     AsyncEngine,
     AsyncSession,
@@ -5,24 +12,134 @@ from sqlalchemy.ext.asyncio import (
     async_sessionmaker,
 )
 from sqlalchemy.orm import declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from typing import Optional
 from app.config import settings
+from app.explain import install_seq_scan_check
+
+logger = logging.getLogger("db-pool")
 
 DATABASE_URL = settings.database_url
 
-engine: AsyncEngine = create_async_engine(
-    DATABASE_URL,
-    echo=False,  # set True while debugging
-    future=True,
+DB_POOL_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a pooled connection (includes connecting)",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+DB_POOL_TIMEOUTS = Counter(
+    "db_pool_checkout_timeouts_total",
+    "Checkouts that gave up after pool_timeout",
 )
+DB_POOL_CHECKOUTS = Counter("db_pool_checkouts_total", "Connection checkouts")
+DB_POOL_CONNECTS = Counter("db_pool_connects_total", "New DBAPI connections")
+
+
+class InstrumentedAsyncQueuePool(AsyncAdaptedQueuePool):
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            DB_POOL_TIMEOUTS.inc()
+            raise
+        finally:
+            DB_POOL_WAIT.observe(time.perf_counter() - started)
+
+
+def engine_connect_args() -> dict:
+    if not settings.db_pgbouncer:
+        return {}
+    return {
+        "statement_cache_size": 0,
+        "prepared_statement_cache_size": 0,
+        "prepared_statement_name_func": lambda: f"__asyncpg_{uuid.uuid4()}__",
+    }
+
+
+def create_engine(url: str) -> AsyncEngine:
+    engine = create_async_engine(
+        url,
+        echo=False,  # set True while debugging
+        future=True,
+        poolclass=InstrumentedAsyncQueuePool,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_recycle=settings.db_pool_recycle,
+        pool_pre_ping=settings.db_pool_pre_ping,
+        connect_args=engine_connect_args(),
+    )
+    event.listen(engine.sync_engine, "checkout", lambda *_: DB_POOL_CHECKOUTS.inc())
+    event.listen(engine.sync_engine, "connect", lambda *_: DB_POOL_CONNECTS.inc())
+    if settings.db_explain_seq_scans:
+        install_seq_scan_check(engine.sync_engine)
+    return engine
+
+
+engine: AsyncEngine = create_engine(DATABASE_URL)
 
 AsyncSessionLocal = async_sessionmaker(
     engine, expire_on_commit=False, class_=AsyncSession
 )
 
+# Read replica for read-only endpoints (get_read_session); without
+# DATABASE_REPLICA_URL they read from the primary.
+replica_engine: Optional[AsyncEngine] = (
+    create_engine(settings.database_replica_url)
+    if settings.database_replica_url
+    else None
+)
+
+ReadSessionLocal = (
+    async_sessionmaker(replica_engine, expire_on_commit=False, class_=AsyncSession)
+    if replica_engine
+    else AsyncSessionLocal
+)
+
 Base = declarative_base()
 
 
+async def warm_up_pool(engine: AsyncEngine = engine, size: Optional[int] = None):
+    """Open `size` pooled connections up front (DB_POOL_WARMUP, default the
+    pool size), so the first requests do not pay for connecting. A failure
+    is only logged: connections are then opened on demand."""
+    if size is None:
+        size = settings.db_pool_warmup
+    if size is None:
+        size = settings.db_pool_size
+    size = min(size, settings.db_pool_size)
+    # Held together, so each checkout opens a new connection; closing them
+    # returns them to the pool.
+    connections = []
+    try:
+        for _ in range(size):
+            conn = await engine.connect()
+            connections.append(conn)
+            await conn.execute(text("SELECT 1"))
+    except Exception as exc:
+        logger.warning(
+            f"Pool warm-up stopped after {len(connections)} connection(s): {exc}"
+        )
+    finally:
+        for conn in connections:
+            await conn.close()
+
+
 # Dependency for FastAPI
 async def get_session() -> AsyncSession:
     async with AsyncSessionLocal() as session:
         yield session
+
+
+async def get_read_session(request: Request) -> AsyncSession:
+    """Session for read-only handlers, on the replica when there is one.
+
+    Replicas lag a little behind the primary; a client that must see its
+    own write (polling right after an upload) sends `X-Read-Primary: 1`.
+    """
+    read_primary = request.headers.get("x-read-primary", "").lower()
+    sessionmaker = (
+        AsyncSessionLocal if read_primary in ("1", "true", "yes") else ReadSessionLocal
+    )
+    async with sessionmaker() as session:
+        yield session
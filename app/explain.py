@@ -0,0 +1,71 @@
+import json
+import logging
+from typing import Iterator, List
+
+from prometheus_client import Counter
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.config import settings
+
+logger = logging.getLogger("db-explain")
+
+DB_SEQ_SCAN_QUERIES = Counter(
+    "db_seq_scan_queries_total",
+    "SELECTs that scan a table even with seq scans disabled",
+    ["table"],
+)
+
+
+def _seq_scans(plan: dict) -> Iterator[str]:
+    if plan.get("Node Type") == "Seq Scan":
+        yield plan["Relation Name"]
+    for child in plan.get("Plans", []):
+        yield from _seq_scans(child)
+
+
+def seq_scanned_tables(dbapi_connection, statement: str, parameters) -> List[str]:
+    """Tables the planner can only read with a sequential scan.
+
+    The statement is explained with enable_seqscan off, so Postgres picks
+    an index whenever one can serve the query; a Seq Scan left in the plan
+    means there is none, whatever the current table sizes are.
+    """
+    cursor = dbapi_connection.cursor()
+    try:
+        # In a savepoint, so a failing EXPLAIN leaves the transaction usable.
+        cursor.execute("SAVEPOINT explain_seq_scan")
+        try:
+            cursor.execute("SET enable_seqscan = off")
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {statement}", parameters)
+            plan = cursor.fetchone()[0]
+        except Exception:
+            cursor.execute("ROLLBACK TO SAVEPOINT explain_seq_scan")
+            raise
+        finally:
+            cursor.execute("RESET enable_seqscan")
+            cursor.execute("RELEASE SAVEPOINT explain_seq_scan")
+    finally:
+        cursor.close()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return list(_seq_scans(plan[0]["Plan"]))
+
+
+def install_seq_scan_check(engine: Engine):
+    allowed = set(settings.db_explain_allowed_tables)
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def check_seq_scan(conn, cursor, statement, parameters, context, executemany):
+        if executemany or not statement.lstrip().upper().startswith("SELECT"):
+            return
+        try:
+            tables = seq_scanned_tables(conn.connection, statement, parameters)
+        except Exception as exc:
+            logger.debug(f"EXPLAIN failed: {exc}")
+            return
+        for table in tables:
+            if table in allowed:
+                continue
+            DB_SEQ_SCAN_QUERIES.labels(table).inc()
+            logger.warning(f"Seq scan on {table} (no usable index): {statement}")
@@ -1,15 +1,18 @@
 import datetime
 from sqlalchemy import (
+    BigInteger,
     Boolean,
     Column,
     DateTime,
     ForeignKey,
+    Index,
     Integer,
     Numeric,
     String,
     Text,
+    UniqueConstraint,
 )
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import deferred, relationship
 from app.db import Base
 
 
@@ -64,9 +67,10 @@ class Proposal(Base):
     satuan_kerja = Column(String, nullable=True)
     anggaran = Column(Numeric, nullable=True, default=0)
     status = Column(String, nullable=True, default="waiting")
-    proposal_verification = Column(Text, nullable=True)
-    summary = Column(Text, nullable=True)
-    evaluasi_letter = Column(Text, nullable=True)
+    # Large agent outputs: not loaded with the row, see repository getters.
+    proposal_verification = deferred(Column(Text, nullable=True), group="content")
+    summary = deferred(Column(Text, nullable=True), group="content")
+    evaluasi_letter = deferred(Column(Text, nullable=True), group="content")
     rincian_output = Column(Text, nullable=True)
     note = Column(Text, nullable=True)
     kro_id = Column(
@@ -79,6 +83,9 @@ class Proposal(Base):
         ForeignKey("proposal_job.id", ondelete="CASCADE"),
         nullable=True,
     )
+    # Bumped whenever the job outputs (success or failure), the note or the
+    # status change; part of the ETag of the /proposal/{id}/* artifacts.
+    artifact_version = Column(Integer, nullable=False, default=0, server_default="0")
 
     jenis_belanja = relationship(
         "JenisBelanja",
@@ -104,6 +111,29 @@ class Proposal(Base):
     )
     kro = relationship("Kro", back_populates="proposal")
 
+    # Keyset pagination of the proposal list, with and without a filter.
+    __table_args__ = (
+        Index("ix_proposal_user_created", "user_id", "created_at", "id"),
+        Index(
+            "ix_proposal_user_status_created", "user_id", "status", "created_at", "id"
+        ),
+        Index(
+            "ix_proposal_user_jenis_belanja_created",
+            "user_id",
+            "jenis_belanja_id",
+            "created_at",
+            "id",
+        ),
+        Index("ix_proposal_user_kro_created", "user_id", "kro_id", "created_at", "id"),
+        Index(
+            "ix_proposal_user_satuan_kerja_created",
+            "user_id",
+            "satuan_kerja",
+            "created_at",
+            "id",
+        ),
+    )
+
 
 class ProposalDocument(Base):
     __tablename__ = "proposal_document"
@@ -118,9 +148,12 @@ class ProposalDocument(Base):
         nullable=False,
     )
     file_name = Column(String, nullable=False)
-    encoding_base_64 = Column(Text, nullable=False)
-    summary = Column(Text, nullable=True)
-    assess_document = Column(Text, nullable=True)
+    # The bytes live in the blob store (src/storage/blob.py) under this hash.
+    content_sha256 = Column(String(64), nullable=False)
+    content_size = Column(BigInteger, nullable=False)
+    content_type = Column(String, nullable=True)
+    summary = deferred(Column(Text, nullable=True), group="content")
+    assess_document = deferred(Column(Text, nullable=True), group="content")
     runtime_id = Column(
         Integer,
         ForeignKey("proposal_job.id", ondelete="CASCADE"),
@@ -131,6 +164,11 @@ class ProposalDocument(Base):
     proposal = relationship("Proposal", back_populates="proposal_document")
     runtime = relationship("ProposalJob", back_populates="proposal_document")
 
+    __table_args__ = (
+        Index("ix_proposal_document_proposal_type", "proposal_id", "type"),
+        Index("ix_proposal_document_runtime", "runtime_id"),
+    )
+
 
 class ProposalJob(Base):
     __tablename__ = "proposal_job"
@@ -150,6 +188,11 @@ class ProposalJob(Base):
     completed_at = Column(DateTime, nullable=True)
     is_error = Column(Boolean, nullable=False, default=False)
     error_message = Column(Text, nullable=True)
+    locked_at = Column(DateTime, nullable=True)
+    locked_by = Column(String, nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    # Not claimable before this time (parked while the agent is unavailable).
+    scheduled_at = Column(DateTime, nullable=True)
 
     proposal = relationship(
         "Proposal",
@@ -157,6 +200,45 @@ class ProposalJob(Base):
         foreign_keys=[proposal_id],
     )
     proposal_document = relationship("ProposalDocument", back_populates="runtime")
+    stages = relationship(
+        "ProposalJobStage",
+        back_populates="job",
+        cascade="all, delete-orphan",
+    )
+
+    __table_args__ = (
+        Index(
+            "ix_proposal_job_queue",
+            "created_at",
+            postgresql_where=status.in_(["queue", "running"]),
+        ),
+        # Latest job of a proposal (active_job_id in the proposal repository).
+        Index("ix_proposal_job_proposal_created", "proposal_id", "created_at"),
+    )
+
+
+class ProposalJobStage(Base):
+    __tablename__ = "proposal_job_stage"
+
+    id = Column(Integer, primary_key=True)
+    created_at = Column(DateTime, default=datetime.datetime.now)
+    updated_at = Column(DateTime, default=datetime.datetime.now)
+    job_id = Column(
+        Integer,
+        ForeignKey("proposal_job.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+    stage = Column(String, nullable=False)
+    status = Column(String, nullable=False, default="running")
+    # JSON encoded stage output, kept until the job completes successfully.
+    output = deferred(Column(Text, nullable=True))
+    error_message = Column(Text, nullable=True)
+    started_at = Column(DateTime, nullable=True)
+    completed_at = Column(DateTime, nullable=True)
+
+    job = relationship("ProposalJob", back_populates="stages")
+
+    __table_args__ = (UniqueConstraint("job_id", "stage"),)
 
 
 class ProposalScoreOverlap(Base):
@@ -175,10 +257,15 @@ class ProposalScoreOverlap(Base):
     score = Column(Integer, nullable=True)
     reason = Column(Text, nullable=True)
     rincian_output = Column(Text, nullable=True)
-    encoding_base_64 = Column(Text, nullable=True)
+    # RAB attachment in the blob store, when the agent returned one.
+    content_sha256 = Column(String(64), nullable=True)
+    content_size = Column(BigInteger, nullable=True)
+    content_type = Column(String, nullable=True)
 
     proposal = relationship("Proposal", back_populates="proposal_score_overlap")
 
+    __table_args__ = (Index("ix_proposal_score_overlap_proposal", "proposal_id"),)
+
 
 class ProposalMapPriority(Base):
     __tablename__ = "proposal_map_priority"
@@ -196,6 +283,8 @@ class ProposalMapPriority(Base):
     reason = Column(Text, nullable=True)
     proposal = relationship("Proposal", back_populates="proposal_map_priority")
 
+    __table_args__ = (Index("ix_proposal_map_priority_proposal", "proposal_id"),)
+
 
 class Kro(Base):
     __tablename__ = "kro"
@@ -206,3 +295,20 @@ class Kro(Base):
     description = Column(Text, nullable=True)
 
     proposal = relationship("Proposal", back_populates="kro")
+
+
+class AgentResponseCache(Base):
+    __tablename__ = "agent_response_cache"
+
+    key = Column(String, primary_key=True)
+    endpoint = Column(String, nullable=False)
+    response = Column(Text, nullable=False)
+    size = Column(Integer, nullable=False)
+    created_at = Column(DateTime, default=datetime.datetime.now)
+    last_hit_at = Column(DateTime, default=datetime.datetime.now)
+    expires_at = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        Index("ix_agent_response_cache_expires_at", "expires_at"),
+        Index("ix_agent_response_cache_last_hit_at", "last_hit_at"),
+    )
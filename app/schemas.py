@@ -1,6 +1,5 @@
 import datetime
 from typing import List, Optional
-from fastapi import UploadFile
 from pydantic import BaseModel
 
 
@@ -40,7 +39,9 @@ class ProposalUpdateSchema(BaseModel):
 
 class ProposalDocumentCreateSchema(BaseModel):
     file_name: str
-    encoding_base_64: str
+    content_sha256: str
+    content_size: int
+    content_type: Optional[str]
     summary: Optional[str]
     assess_document: Optional[str]
 
@@ -48,12 +49,19 @@ class ProposalDocumentCreateSchema(BaseModel):
         from_attributes = True
 
 
+class StoredFileSchema(BaseModel):
+    file_name: str
+    content_sha256: str
+    content_size: int
+    content_type: Optional[str]
+
+
 class ProposalDocumentUploadSchema(BaseModel):
     proposal_id: int
-    kak_file: UploadFile
-    rab_file: UploadFile
-    sp_file: UploadFile
-    doc_supports: Optional[List[UploadFile]]
+    kak_file: StoredFileSchema
+    rab_file: StoredFileSchema
+    sp_file: StoredFileSchema
+    doc_supports: Optional[List[StoredFileSchema]]
 
 
 class ProposalJobCreateSchema(BaseModel):
@@ -0,0 +1,251 @@
+"""Stand-in for the LLM agent service, for load tests and benchmarks.
+
+Implements the six endpoints `background_process_job_agent` calls, with
+response shapes the pipeline accepts. Every endpoint has a latency
+distribution, an error rate and a response size, taken from the defaults
+below and overridden by a JSON profile:
+
+    {
+      "/api/v1/summarizer": {
+        "latency": {"dist": "lognormal", "median": 4.0, "sigma": 0.5},
+        "error_rate": 0.05,
+        "error_status": 503,
+        "response_bytes": 8000
+      }
+    }
+
+Latency distributions: constant(value), uniform(min, max),
+lognormal(median, sigma), exponential(mean); all in seconds.
+
+    uv run python -m bench.mock_agent --port 9000 --profile profile.json
+
+then point the API and worker at it with AGENT_URL=http://localhost:9000.
+GET /stats reports calls, errors, bytes received and peak concurrency per
+endpoint; POST /stats/reset clears them.
+"""
+
+import argparse
+import asyncio
+import base64
+import copy
+import json
+import os
+import random
+from typing import Dict
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+AGENT_PATH_SUMMARY = "/api/v1/parse-single-base64"
+AGENT_PATH_ASSESS_DOCUMENT = "/api/v1/assess-documents"
+AGENT_PATH_EXTRACT_DOCUMENT = "/api/v1/extract-from-base64"
+AGENT_PATH_OVERLAP_COMPARATOR = "/api/v1/overlap-comparator-vector"
+AGENT_PATH_SUMMARIZER = "/api/v1/summarizer"
+AGENT_PATH_RECOMMENDATION_GENERATOR = "/api/v1/recommendation-generator"
+
+DEFAULT_PROFILE: Dict[str, dict] = {
+    AGENT_PATH_SUMMARY: {
+        "latency": {"dist": "lognormal", "median": 3.0, "sigma": 0.4},
+        "response_bytes": 4000,
+    },
+    AGENT_PATH_ASSESS_DOCUMENT: {
+        "latency": {"dist": "lognormal", "median": 6.0, "sigma": 0.4},
+        "response_bytes": 3000,
+    },
+    AGENT_PATH_EXTRACT_DOCUMENT: {
+        "latency": {"dist": "lognormal", "median": 2.0, "sigma": 0.3},
+        "response_bytes": 300,
+    },
+    AGENT_PATH_OVERLAP_COMPARATOR: {
+        "latency": {"dist": "lognormal", "median": 4.0, "sigma": 0.5},
+        "response_bytes": 2000,
+        # Each overlap row carries a base64 RAB attachment of this size.
+        "rows": 3,
+        "attachment_bytes": 200_000,
+    },
+    AGENT_PATH_SUMMARIZER: {
+        "latency": {"dist": "lognormal", "median": 5.0, "sigma": 0.4},
+        "response_bytes": 6000,
+    },
+    AGENT_PATH_RECOMMENDATION_GENERATOR: {
+        "latency": {"dist": "lognormal", "median": 5.0, "sigma": 0.4},
+        "response_bytes": 6000,
+    },
+}
+
+ENDPOINT_DEFAULTS = {
+    "latency": {"dist": "constant", "value": 0.0},
+    "error_rate": 0.0,
+    "error_status": 500,
+    "response_bytes": 1000,
+}
+
+WORDS = (
+    "anggaran kegiatan output direktorat hutan lestari program rencana "
+    "strategis prioritas nasional evaluasi dokumen kerangka acuan kerja"
+).split()
+
+
+def load_profile(path: str = None, latency_scale: float = 1.0) -> Dict[str, dict]:
+    profile = copy.deepcopy(DEFAULT_PROFILE)
+    if path:
+        with open(path) as f:
+            for endpoint, overrides in json.load(f).items():
+                profile.setdefault(endpoint, {}).update(overrides)
+    for endpoint, config in profile.items():
+        profile[endpoint] = {**ENDPOINT_DEFAULTS, **config}
+        profile[endpoint]["latency_scale"] = latency_scale
+    return profile
+
+
+def sample_latency(config: dict) -> float:
+    latency = config["latency"]
+    dist = latency.get("dist", "constant")
+    if dist == "constant":
+        value = latency.get("value", 0.0)
+    elif dist == "uniform":
+        value = random.uniform(latency["min"], latency["max"])
+    elif dist == "lognormal":
+        value = random.lognormvariate(0, latency["sigma"]) * latency["median"]
+    elif dist == "exponential":
+        value = random.expovariate(1 / latency["mean"])
+    else:
+        raise ValueError(f"Unknown latency distribution {dist}")
+    return value * config["latency_scale"]
+
+
+def text(size: int) -> str:
+    words = []
+    length = 0
+    while length < size:
+        word = random.choice(WORDS)
+        words.append(word)
+        length += len(word) + 1
+    return " ".join(words)[:size]
+
+
+def build_response(path: str, body: dict, config: dict) -> dict:
+    size = config["response_bytes"]
+    if path == AGENT_PATH_ASSESS_DOCUMENT:
+        # Verification reads result.data, map priority result.skor/alasan.
+        return {
+            "result": {
+                "data": text(size),
+                "skor": random.randint(0, 100),
+                "alasan": text(size // 4),
+            }
+        }
+    if path == AGENT_PATH_EXTRACT_DOCUMENT:
+        return {
+            "data": [
+                {"key": "Rincian Output", "value": text(min(size, 200))},
+                {"key": "Direktorat", "value": "Direktorat Rencana Kehutanan"},
+                {"key": "Total Biaya", "value": "1.250.000.000"},
+            ]
+        }
+    if path == AGENT_PATH_OVERLAP_COMPARATOR:
+        attachment = base64.b64encode(os.urandom(config["attachment_bytes"]))
+        return {
+            "result": [
+                {
+                    "direktorat": "Direktorat Rencana Kehutanan",
+                    "skor": random.randint(0, 100),
+                    "total_biaya": "1.250.000.000",
+                    "alasan": text(size // config["rows"]),
+                    "rincian_output": text(100),
+                    "db_base64_rab": attachment.decode("ascii"),
+                }
+                for _ in range(config["rows"])
+            ]
+        }
+    return {"data": text(size)}
+
+
+def create_app(profile: Dict[str, dict]) -> FastAPI:
+    app = FastAPI(title="Mock agent")
+    stats: Dict[str, dict] = {}
+
+    def endpoint_stats(path: str) -> dict:
+        return stats.setdefault(
+            path,
+            {
+                "calls": 0,
+                "errors": 0,
+                "in_flight": 0,
+                "peak_in_flight": 0,
+                "request_bytes": 0,
+                "response_bytes": 0,
+            },
+        )
+
+    def register(path: str):
+        config = profile[path]
+
+        async def handler(request: Request):
+            current = endpoint_stats(path)
+            current["calls"] += 1
+            current["in_flight"] += 1
+            current["peak_in_flight"] = max(
+                current["peak_in_flight"], current["in_flight"]
+            )
+            try:
+                payload = bytearray()
+                async for chunk in request.stream():
+                    payload += chunk
+                current["request_bytes"] += len(payload)
+                body = json.loads(payload) if payload else {}
+                del payload
+
+                await asyncio.sleep(sample_latency(config))
+                if random.random() < config["error_rate"]:
+                    current["errors"] += 1
+                    return JSONResponse(
+                        {"detail": "mock agent error"},
+                        status_code=config["error_status"],
+                    )
+                response = JSONResponse(build_response(path, body, config))
+                current["response_bytes"] += len(response.body)
+                return response
+            finally:
+                current["in_flight"] -= 1
+
+        app.add_api_route(path, handler, methods=["POST"])
+
+    for path in profile:
+        register(path)
+
+    @app.get("/stats")
+    async def get_stats():
+        return stats
+
+    @app.post("/stats/reset")
+    async def reset_stats():
+        stats.clear()
+        return stats
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--profile", help="JSON file overriding endpoint config")
+    parser.add_argument(
+        "--latency-scale",
+        type=float,
+        default=1.0,
+        help="Multiply every sampled latency (e.g. 0.1 for quick runs)",
+    )
+    parser.add_argument("--seed", type=int, help="Seed for reproducible runs")
+    args = parser.parse_args()
+
+    if args.seed is not None:
+        random.seed(args.seed)
+    app = create_app(load_profile(args.profile, args.latency_scale))
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,361 @@
+"""End-to-end throughput benchmark of the proposal pipeline.
+
+Drives N uploads through ``POST /api/proposal/document`` (at most
+`--concurrency` at a time), waits for the worker(s) to finish every job
+and reports:
+
+- jobs/minute (first upload to last job completion)
+- p50/p95/p99 latency of every pipeline stage, from proposal_job_stage
+- job latency (queued to completed) and upload latency
+- database connections held (pg_stat_activity, sampled)
+- peak RSS of the API and worker processes (process_resident_memory_bytes
+  scraped from their /metrics endpoints)
+- agent calls per endpoint, when the mock agent is used (GET /stats)
+
+Typical run against the mock agent:
+
+    uv run python -m bench.mock_agent --latency-scale 0.1 &
+    AGENT_URL=http://localhost:9000 uv run uvicorn main:app --port 8000 &
+    AGENT_URL=http://localhost:9000 uv run python worker.py &
+    uv run python -m bench.pipeline_benchmark --jobs 50 --concurrency 10 \\
+        --agent-url http://localhost:9000
+
+The database is read through DATABASE_URL (same .env as the API).
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+import httpx
+from prometheus_client.parser import text_string_to_metric_families
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app import models
+from app.config import settings
+
+TERMINAL_STATUSES = ("completed", "failed")
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(values: List[float]) -> dict:
+    return {
+        "count": len(values),
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "max": max(values) if values else None,
+    }
+
+
+def fake_pdf(size: int) -> bytes:
+    return b"%PDF-1.4\n" + os.urandom(max(size - 9, 0))
+
+
+class Sampler:
+    """Samples DB connections and process RSS while the benchmark runs."""
+
+    def __init__(self, engine, metrics_urls: List[str], interval: float):
+        self.engine = engine
+        self.metrics_urls = metrics_urls
+        self.interval = interval
+        self.db_connections: List[int] = []
+        self.db_active_connections: List[int] = []
+        self.peak_rss: Dict[str, float] = {}
+
+    async def sample_db(self):
+        async with self.engine.connect() as conn:
+            row = (
+                await conn.execute(
+                    text(
+                        "SELECT count(*) AS total, "
+                        "count(*) FILTER (WHERE state <> 'idle') AS active "
+                        "FROM pg_stat_activity "
+                        "WHERE datname = current_database() "
+                        "AND pid <> pg_backend_pid()"
+                    )
+                )
+            ).one()
+        self.db_connections.append(row.total)
+        self.db_active_connections.append(row.active)
+
+    async def sample_rss(self, client: httpx.AsyncClient, url: str):
+        try:
+            res = await client.get(url)
+            res.raise_for_status()
+        except httpx.HTTPError:
+            return
+        for family in text_string_to_metric_families(res.text):
+            if family.name == "process_resident_memory_bytes":
+                for sample in family.samples:
+                    self.peak_rss[url] = max(self.peak_rss.get(url, 0), sample.value)
+
+    async def run(self, stop: asyncio.Event):
+        async with httpx.AsyncClient(timeout=5) as client:
+            while not stop.is_set():
+                await asyncio.gather(
+                    self.sample_db(),
+                    *[self.sample_rss(client, url) for url in self.metrics_urls],
+                    return_exceptions=True,
+                )
+                try:
+                    await asyncio.wait_for(stop.wait(), self.interval)
+                except asyncio.TimeoutError:
+                    pass
+
+
+async def upload_one(client: httpx.AsyncClient, args) -> dict:
+    started = time.perf_counter()
+    res = await client.post(
+        "/api/proposal/",
+        json={
+            "kro_id": args.kro_id,
+            "jenis_belanja_id": args.jenis_belanja_id,
+            "sub_jenis_belanja_id": args.sub_jenis_belanja_id,
+        },
+    )
+    res.raise_for_status()
+    proposal_id = res.json()["data"]["proposal_id"]
+
+    size = args.file_kb * 1024
+    files = [
+        ("kak_file", ("kak.pdf", fake_pdf(size), "application/pdf")),
+        ("rab_file", ("rab.pdf", fake_pdf(size), "application/pdf")),
+        ("sp_file", ("sp.pdf", fake_pdf(size), "application/pdf")),
+    ] + [
+        ("doc_supports", (f"support-{i}.pdf", fake_pdf(size), "application/pdf"))
+        for i in range(args.doc_supports)
+    ]
+    res = await client.post(
+        "/api/proposal/document",
+        data={"proposal_id": str(proposal_id)},
+        files=files,
+    )
+    res.raise_for_status()
+    return {
+        "proposal_id": proposal_id,
+        "job_id": res.json()["data"],
+        "upload_seconds": time.perf_counter() - started,
+    }
+
+
+async def wait_for_jobs(engine, job_ids: List[int], timeout: float) -> list:
+    deadline = time.monotonic() + timeout
+    while True:
+        async with engine.connect() as conn:
+            rows = (
+                await conn.execute(
+                    select(
+                        models.ProposalJob.id,
+                        models.ProposalJob.status,
+                        models.ProposalJob.is_error,
+                        models.ProposalJob.created_at,
+                        models.ProposalJob.completed_at,
+                        models.ProposalJob.updated_at,
+                    ).where(models.ProposalJob.id.in_(job_ids))
+                )
+            ).all()
+        done = [row for row in rows if row.status in TERMINAL_STATUSES]
+        print(f"\r{len(done)}/{len(job_ids)} jobs finished", end="", flush=True)
+        if len(done) == len(job_ids) or time.monotonic() > deadline:
+            print()
+            return rows
+        await asyncio.sleep(1)
+
+
+async def stage_latencies(engine, job_ids: List[int]) -> Dict[str, List[float]]:
+    stage = models.ProposalJobStage
+    async with engine.connect() as conn:
+        rows = (
+            await conn.execute(
+                select(stage.stage, stage.started_at, stage.completed_at).where(
+                    stage.job_id.in_(job_ids),
+                    stage.status == "completed",
+                    stage.started_at.is_not(None),
+                    stage.completed_at.is_not(None),
+                )
+            )
+        ).all()
+    latencies = defaultdict(list)
+    for row in rows:
+        latencies[row.stage].append((row.completed_at - row.started_at).total_seconds())
+    return dict(latencies)
+
+
+def print_table(title: str, rows: Dict[str, dict]):
+    print(f"\n{title}")
+    print(f"  {'':<16}{'n':>6}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}")
+    for name, stats in rows.items():
+        cells = [
+            f"{stats[key]:>10.2f}" if stats[key] is not None else f"{'-':>10}"
+            for key in ("p50", "p95", "p99", "max")
+        ]
+        print(f"  {name:<16}{stats['count']:>6}{''.join(cells)}")
+
+
+async def run(args) -> dict:
+    engine = create_async_engine(settings.database_url, pool_size=2)
+    metrics_urls = args.metrics_url or [
+        f"{args.api_url}/metrics",
+        f"http://localhost:{settings.worker_metrics_port}/metrics",
+    ]
+    sampler = Sampler(engine, metrics_urls, args.sample_interval)
+    stop_sampling = asyncio.Event()
+    sampling = asyncio.create_task(sampler.run(stop_sampling))
+
+    async with httpx.AsyncClient(
+        base_url=args.api_url,
+        headers={"X-API-Key": args.api_key},
+        timeout=args.http_timeout,
+    ) as client:
+        if args.agent_url:
+            await client.post(f"{args.agent_url}/stats/reset")
+
+        semaphore = asyncio.Semaphore(args.concurrency)
+
+        async def limited_upload():
+            async with semaphore:
+                return await upload_one(client, args)
+
+        started_at = time.time()
+        uploads = await asyncio.gather(
+            *[limited_upload() for _ in range(args.jobs)],
+            return_exceptions=True,
+        )
+        upload_errors = [u for u in uploads if isinstance(u, BaseException)]
+        uploads = [u for u in uploads if not isinstance(u, BaseException)]
+        job_ids = [u["job_id"] for u in uploads]
+        print(f"{len(uploads)} uploads accepted, {len(upload_errors)} failed")
+
+        jobs = await wait_for_jobs(engine, job_ids, args.timeout) if job_ids else []
+        finished_at = time.time()
+
+        agent_stats = None
+        if args.agent_url:
+            agent_stats = (await client.get(f"{args.agent_url}/stats")).json()
+
+    stop_sampling.set()
+    await sampling
+
+    succeeded = [j for j in jobs if j.status == "completed" and not j.is_error]
+    failed = [j for j in jobs if j.status in TERMINAL_STATUSES and j not in succeeded]
+    unfinished = [j for j in jobs if j.status not in TERMINAL_STATUSES]
+    job_seconds = [
+        (j.completed_at - j.created_at).total_seconds()
+        for j in succeeded
+        if j.completed_at and j.created_at
+    ]
+    stages = await stage_latencies(engine, job_ids) if job_ids else {}
+    await engine.dispose()
+
+    wall_seconds = finished_at - started_at
+    report = {
+        "jobs": args.jobs,
+        "succeeded": len(succeeded),
+        "failed": len(failed),
+        "unfinished": len(unfinished),
+        "upload_errors": [repr(e) for e in upload_errors],
+        "wall_seconds": wall_seconds,
+        "jobs_per_minute": len(succeeded) / wall_seconds * 60 if wall_seconds else 0,
+        "upload_latency": summarize([u["upload_seconds"] for u in uploads]),
+        "job_latency": summarize(job_seconds),
+        "stage_latency": {name: summarize(v) for name, v in sorted(stages.items())},
+        "db_connections": {
+            "peak": max(sampler.db_connections, default=None),
+            "peak_active": max(sampler.db_active_connections, default=None),
+            "mean": (
+                sum(sampler.db_connections) / len(sampler.db_connections)
+                if sampler.db_connections
+                else None
+            ),
+        },
+        "peak_rss_mb": {
+            url: round(value / 1024 / 1024, 1)
+            for url, value in sampler.peak_rss.items()
+        },
+        "agent": agent_stats,
+    }
+    return report
+
+
+def print_report(report: dict):
+    print(
+        f"\n{report['succeeded']}/{report['jobs']} jobs succeeded "
+        f"({report['failed']} failed, {report['unfinished']} unfinished) "
+        f"in {report['wall_seconds']:.1f}s"
+    )
+    print(f"Throughput: {report['jobs_per_minute']:.2f} jobs/minute")
+    print_table(
+        "Latency (seconds)",
+        {"upload": report["upload_latency"], "job": report["job_latency"]},
+    )
+    print_table("Stage latency (seconds)", report["stage_latency"])
+
+    db = report["db_connections"]
+    print(
+        f"\nDB connections: peak {db['peak']} (active {db['peak_active']}), "
+        f"mean {db['mean']:.1f}"
+        if db["mean"] is not None
+        else "\nDB connections: not sampled"
+    )
+    for url, rss in report["peak_rss_mb"].items():
+        print(f"Peak RSS {url}: {rss} MB")
+    if report["agent"]:
+        print("\nAgent calls")
+        for path, stats in report["agent"].items():
+            print(
+                f"  {path:<40}{stats['calls']:>6} calls"
+                f"{stats['errors']:>5} errors"
+                f"  peak concurrency {stats['peak_in_flight']}"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--api-url", default="http://localhost:8000")
+    parser.add_argument("--api-key", default=settings.x_api_key)
+    parser.add_argument("--jobs", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=5)
+    parser.add_argument("--file-kb", type=int, default=512)
+    parser.add_argument("--doc-supports", type=int, default=1)
+    parser.add_argument("--kro-id", type=int, default=1)
+    parser.add_argument("--jenis-belanja-id", type=int, default=1)
+    parser.add_argument("--sub-jenis-belanja-id", type=int, default=1)
+    parser.add_argument(
+        "--metrics-url",
+        action="append",
+        help="Prometheus endpoint to read RSS from (repeatable); "
+        "defaults to the API and the worker metrics port",
+    )
+    parser.add_argument("--agent-url", help="Mock agent URL, for its /stats")
+    parser.add_argument("--sample-interval", type=float, default=1.0)
+    parser.add_argument("--http-timeout", type=float, default=120)
+    parser.add_argument(
+        "--timeout", type=float, default=1800, help="Seconds to wait for the jobs"
+    )
+    parser.add_argument("--json", help="Also write the report to this file")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2, default=str)
+
+
+if __name__ == "__main__":
+    main()
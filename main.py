@@ -1,10 +1,24 @@
+import asyncio
+import logging
 import uvicorn
 
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from app.config import settings
+from app.db import engine, replica_engine, warm_up_pool
+from src.agent.client import agent_client
+from src.controller.metrics import router as metrics_router
+from src.metrics.agent import register_agent_metrics
+from src.middleware.compression_middleware import CompressionMiddleware
 from src.middleware.logger_middleware import LoggingMiddleware
+from src.middleware.metrics_middleware import MetricsMiddleware
+from src.pipeline.worker import run_worker
+from src.reference.cache import reference_cache
 from src.router.router import apirouter
 
+logger = logging.getLogger("api-logger")
+
 origins = [
     "https://klhk-budget-preclearance.vercel.app",
     "https://kemenhut-budget-preclearance.vercel.app",
@@ -12,8 +26,36 @@ origins = [
 ]
 
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await warm_up_pool()
+    if replica_engine is not None:
+        await warm_up_pool(replica_engine)
+    try:
+        await reference_cache.refresh()
+    except Exception as exc:
+        # Loaded by the first request instead (ReferenceCache.get).
+        logger.warning(f"Reference data not loaded at startup: {exc}")
+    await agent_client.start()
+    stop = asyncio.Event()
+    worker = None
+    if settings.embedded_worker:
+        register_agent_metrics()
+        worker = asyncio.create_task(run_worker(stop))
+    yield
+    if worker:
+        stop.set()
+        await worker
+    await agent_client.close()
+    await engine.dispose()
+    if replica_engine is not None:
+        await replica_engine.dispose()
+
+
+app = FastAPI(lifespan=lifespan)
 app.add_middleware(LoggingMiddleware)
+# Outside the logger, which logs the uncompressed bodies.
+app.add_middleware(CompressionMiddleware)
 
 app.add_middleware(
     CORSMiddleware,
@@ -21,9 +63,13 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
+app.add_middleware(MetricsMiddleware)
+
 app.include_router(apirouter, prefix="/api")
+app.include_router(metrics_router)
 
 
 def main():
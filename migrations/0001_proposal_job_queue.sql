@@ -0,0 +1,9 @@
+-- Durable job queue on proposal_job (worker.py claims rows with
+-- FOR UPDATE SKIP LOCKED and keeps a lease through locked_at).
+ALTER TABLE proposal_job ADD COLUMN IF NOT EXISTS locked_at TIMESTAMP WITHOUT TIME ZONE;
+ALTER TABLE proposal_job ADD COLUMN IF NOT EXISTS locked_by VARCHAR;
+ALTER TABLE proposal_job ADD COLUMN IF NOT EXISTS attempts INTEGER NOT NULL DEFAULT 0;
+
+CREATE INDEX IF NOT EXISTS ix_proposal_job_queue
+    ON proposal_job (created_at)
+    WHERE status IN ('queue', 'running');
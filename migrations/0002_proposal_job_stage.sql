@@ -0,0 +1,14 @@
+-- Per-stage checkpoints so a retried job resumes from the failed stage.
+CREATE TABLE IF NOT EXISTS proposal_job_stage (
+    id SERIAL PRIMARY KEY,
+    created_at TIMESTAMP WITHOUT TIME ZONE,
+    updated_at TIMESTAMP WITHOUT TIME ZONE,
+    job_id INTEGER NOT NULL REFERENCES proposal_job (id) ON DELETE CASCADE,
+    stage VARCHAR NOT NULL,
+    status VARCHAR NOT NULL,
+    output TEXT,
+    error_message TEXT,
+    started_at TIMESTAMP WITHOUT TIME ZONE,
+    completed_at TIMESTAMP WITHOUT TIME ZONE,
+    UNIQUE (job_id, stage)
+);
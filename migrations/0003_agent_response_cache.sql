@@ -0,0 +1,14 @@
+-- Content-addressed cache of agent responses (src/agent/cache.py).
+CREATE TABLE IF NOT EXISTS agent_response_cache (
+    key VARCHAR PRIMARY KEY,
+    endpoint VARCHAR NOT NULL,
+    response TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at TIMESTAMP WITHOUT TIME ZONE,
+    last_hit_at TIMESTAMP WITHOUT TIME ZONE,
+    expires_at TIMESTAMP WITHOUT TIME ZONE NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_agent_response_cache_expires_at
+    ON agent_response_cache (expires_at);
+CREATE INDEX IF NOT EXISTS ix_agent_response_cache_last_hit_at
+    ON agent_response_cache (last_hit_at);
@@ -0,0 +1,3 @@
+-- Jobs parked while the agent circuit breaker is open are not claimable
+-- before scheduled_at.
+ALTER TABLE proposal_job ADD COLUMN IF NOT EXISTS scheduled_at TIMESTAMP WITHOUT TIME ZONE;
@@ -0,0 +1,7 @@
+-- Agent request bodies read document base64 with substr() in slices.
+-- Postgres can only fetch the TOAST chunks a slice needs when the value is
+-- stored uncompressed (EXTERNAL); compressed values are decompressed in
+-- full for every slice. Base64 barely compresses anyway.
+-- Only affects rows written afterwards; existing rows keep their storage
+-- until rewritten.
+ALTER TABLE proposal_document ALTER COLUMN encoding_base_64 SET STORAGE EXTERNAL;
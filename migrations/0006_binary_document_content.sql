@@ -0,0 +1,32 @@
+-- Documents and RAB attachments are stored as raw bytes (bytea) instead of
+-- base64 text: a third less storage and TOAST I/O, no encode on upload and
+-- no decode on download. Existing rows are converted in place.
+-- PDFs are already compressed, so the values are stored uncompressed
+-- (EXTERNAL); agent requests read them in slices with substr().
+DO $$
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM information_schema.columns
+        WHERE table_name = 'proposal_document' AND column_name = 'encoding_base_64'
+    ) THEN
+        ALTER TABLE proposal_document ADD COLUMN IF NOT EXISTS content BYTEA;
+        ALTER TABLE proposal_document ALTER COLUMN content SET STORAGE EXTERNAL;
+        UPDATE proposal_document
+        SET content = decode(encoding_base_64, 'base64')
+        WHERE content IS NULL;
+        ALTER TABLE proposal_document ALTER COLUMN content SET NOT NULL;
+        ALTER TABLE proposal_document DROP COLUMN encoding_base_64;
+    END IF;
+
+    IF EXISTS (
+        SELECT 1 FROM information_schema.columns
+        WHERE table_name = 'proposal_score_overlap' AND column_name = 'encoding_base_64'
+    ) THEN
+        ALTER TABLE proposal_score_overlap ADD COLUMN IF NOT EXISTS content BYTEA;
+        ALTER TABLE proposal_score_overlap ALTER COLUMN content SET STORAGE EXTERNAL;
+        UPDATE proposal_score_overlap
+        SET content = decode(encoding_base_64, 'base64')
+        WHERE content IS NULL AND encoding_base_64 IS NOT NULL AND encoding_base_64 <> '';
+        ALTER TABLE proposal_score_overlap DROP COLUMN encoding_base_64;
+    END IF;
+END $$;
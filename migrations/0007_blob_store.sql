@@ -0,0 +1,10 @@
+-- Document bytes move to the content-addressed blob store; the rows keep
+-- the hash, size and MIME type. Run migrations/0008_move_content_to_blob_store.py
+-- afterwards to copy existing content out and drop the bytea columns.
+ALTER TABLE proposal_document ADD COLUMN IF NOT EXISTS content_sha256 VARCHAR(64);
+ALTER TABLE proposal_document ADD COLUMN IF NOT EXISTS content_size BIGINT;
+ALTER TABLE proposal_document ADD COLUMN IF NOT EXISTS content_type VARCHAR;
+
+ALTER TABLE proposal_score_overlap ADD COLUMN IF NOT EXISTS content_sha256 VARCHAR(64);
+ALTER TABLE proposal_score_overlap ADD COLUMN IF NOT EXISTS content_size BIGINT;
+ALTER TABLE proposal_score_overlap ADD COLUMN IF NOT EXISTS content_type VARCHAR;
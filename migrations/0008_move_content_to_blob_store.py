@@ -0,0 +1,113 @@
+"""Copy document bytes from the bytea `content` columns into the blob store.
+
+Run after 0007_blob_store.sql, with the same environment as the API (the
+blob store must be the one the API and worker use):
+
+    PYTHONPATH=. python migrations/0008_move_content_to_blob_store.py
+
+Rows are copied one at a time in slices, so memory stays flat whatever
+the document size. The script can be interrupted and re-run; once every
+row is copied it makes the hash/size columns of proposal_document NOT NULL
+and drops the `content` columns.
+"""
+
+import asyncio
+import mimetypes
+
+from sqlalchemy import text
+
+from app.config import settings
+from app.db import AsyncSessionLocal
+from src.storage.blob import blob_store
+
+TABLES = {
+    "proposal_document": "file_name",
+    "proposal_score_overlap": None,
+}
+
+
+async def has_content_column(session, table: str) -> bool:
+    rColumn = await session.execute(
+        text(
+            "SELECT 1 FROM information_schema.columns "
+            "WHERE table_name = :table AND column_name = 'content'"
+        ),
+        {"table": table},
+    )
+    return rColumn.first() is not None
+
+
+async def copy_row(session, table: str, id: int, file_name: str):
+    rSize = await session.execute(
+        text(f"SELECT octet_length(content) FROM {table} WHERE id = :id"),
+        {"id": id},
+    )
+    size = rSize.scalar_one()
+    chunk_size = settings.blob_chunk_size
+    async with blob_store.writer() as writer:
+        for offset in range(0, size, chunk_size):
+            rChunk = await session.execute(
+                text(
+                    f"SELECT substr(content, :start, :length) FROM {table} WHERE id = :id"
+                ),
+                {"id": id, "start": offset + 1, "length": chunk_size},
+            )
+            await writer.write(rChunk.scalar_one())
+        blob = await writer.commit()
+
+    content_type = (
+        mimetypes.guess_type(file_name)[0] if file_name else None
+    ) or "application/pdf"
+    await session.execute(
+        text(
+            f"UPDATE {table} SET content_sha256 = :sha256, content_size = :size, "
+            "content_type = :content_type WHERE id = :id"
+        ),
+        {
+            "id": id,
+            "sha256": blob.sha256,
+            "size": blob.size,
+            "content_type": content_type,
+        },
+    )
+    await session.commit()
+
+
+async def migrate_table(table: str, name_column: str):
+    async with AsyncSessionLocal() as session:
+        if not await has_content_column(session, table):
+            print(f"{table}: already migrated")
+            return
+
+        name = name_column or "NULL"
+        rRows = await session.execute(
+            text(
+                f"SELECT id, {name} AS file_name FROM {table} "
+                "WHERE content IS NOT NULL AND content_sha256 IS NULL ORDER BY id"
+            )
+        )
+        rows = rRows.all()
+        for index, row in enumerate(rows, 1):
+            await copy_row(session, table, row.id, row.file_name)
+            print(f"{table}: {index}/{len(rows)}", end="\r", flush=True)
+        print(f"{table}: copied {len(rows)} row(s)")
+
+        if table == "proposal_document":
+            await session.execute(
+                text(
+                    "ALTER TABLE proposal_document "
+                    "ALTER COLUMN content_sha256 SET NOT NULL, "
+                    "ALTER COLUMN content_size SET NOT NULL"
+                )
+            )
+        await session.execute(text(f"ALTER TABLE {table} DROP COLUMN content"))
+        await session.commit()
+
+
+async def main():
+    for table, name_column in TABLES.items():
+        await migrate_table(table, name_column)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
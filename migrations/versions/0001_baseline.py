@@ -0,0 +1,26 @@
+"""Baseline: the schema built by the numbered scripts in migrations/
+
+The tables and the changes in migrations/0001_*.sql to 0008_*.py predate
+Alembic. A database that has them applied is marked as being at this
+revision with `alembic stamp 0001`; later changes are revisions here.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 09:00:00
+
+"""
+
+from typing import Sequence, Union
+
+revision: str = "0001"
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    pass
+
+
+def downgrade() -> None:
+    pass
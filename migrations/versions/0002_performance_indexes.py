@@ -0,0 +1,80 @@
+"""Indexes for the hot lookups of the repositories
+
+Built with CREATE INDEX CONCURRENTLY, outside a transaction, so the tables
+stay writable while they build. A build that fails leaves an INVALID index
+behind; drop it and run the upgrade again.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 09:30:00
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "0002"
+down_revision: Union[str, Sequence[str], None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = [
+    # Documents of a proposal by type (detail and download endpoints).
+    (
+        "ix_proposal_document_proposal_type",
+        "proposal_document",
+        ["proposal_id", "type"],
+    ),
+    # Documents of a job (pipeline).
+    ("ix_proposal_document_runtime", "proposal_document", ["runtime_id"]),
+    ("ix_proposal_map_priority_proposal", "proposal_map_priority", ["proposal_id"]),
+    ("ix_proposal_score_overlap_proposal", "proposal_score_overlap", ["proposal_id"]),
+    # Latest job of a proposal; also serves proposal_job(proposal_id).
+    ("ix_proposal_job_proposal_created", "proposal_job", ["proposal_id", "created_at"]),
+    # Keyset pagination of the proposal list, with and without a filter.
+    ("ix_proposal_user_created", "proposal", ["user_id", "created_at", "id"]),
+    (
+        "ix_proposal_user_status_created",
+        "proposal",
+        ["user_id", "status", "created_at", "id"],
+    ),
+    (
+        "ix_proposal_user_jenis_belanja_created",
+        "proposal",
+        ["user_id", "jenis_belanja_id", "created_at", "id"],
+    ),
+    (
+        "ix_proposal_user_kro_created",
+        "proposal",
+        ["user_id", "kro_id", "created_at", "id"],
+    ),
+    (
+        "ix_proposal_user_satuan_kerja_created",
+        "proposal",
+        ["user_id", "satuan_kerja", "created_at", "id"],
+    ),
+]
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(
+                name,
+                table,
+                columns,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(
+                name,
+                table_name=table,
+                postgresql_concurrently=True,
+                if_exists=True,
+            )
@@ -0,0 +1,145 @@
+import base64
+import hashlib
+import json
+import math
+from abc import ABC, abstractmethod
+from typing import Any, AsyncIterator, List, Optional
+
+from app.config import settings
+from src.storage.blob import BlobStore
+
+
+class Base64Source(ABC):
+    """A base64 string that is produced chunk by chunk when the request
+    body is written, instead of being held in memory as one `str`."""
+
+    @abstractmethod
+    async def length(self) -> int:
+        raise NotImplementedError
+
+    @abstractmethod
+    def iter_base64(self, chunk_size: int) -> AsyncIterator[str]:
+        raise NotImplementedError
+
+    async def digest(self) -> str:
+        """SHA-256 identifying the content, used for agent cache keys."""
+        sha = hashlib.sha256()
+        async for chunk in self.iter_base64(settings.agent_body_chunk_size):
+            sha.update(chunk.encode("ascii"))
+        return sha.hexdigest()
+
+
+class BlobBase64Source(Base64Source):
+    """A blob from the blob store, base64-encoded slice by slice while the
+    request is written. Slices are a multiple of 3 bytes so the encoded
+    pieces concatenate into one valid base64 string."""
+
+    def __init__(self, store: BlobStore, sha256: str, size: int):
+        self.store = store
+        self.sha256 = sha256
+        self.size = size
+
+    async def length(self) -> int:
+        return 4 * math.ceil(self.size / 3)
+
+    async def iter_base64(self, chunk_size: int) -> AsyncIterator[str]:
+        raw_chunk_size = max(chunk_size // 4, 1) * 3
+        pending = b""
+        async for chunk in self.store.iter_range(
+            self.sha256, chunk_size=raw_chunk_size
+        ):
+            # Reads may come back short; only encode whole 3-byte groups.
+            pending += chunk
+            usable = len(pending) - len(pending) % 3
+            if usable:
+                yield base64.b64encode(pending[:usable]).decode("ascii")
+                pending = pending[usable:]
+        if pending:
+            yield base64.b64encode(pending).decode("ascii")
+
+    async def digest(self) -> str:
+        # Blobs are addressed by the SHA-256 of their bytes already.
+        return self.sha256
+
+
+def iter_sources(value: Any) -> List[Base64Source]:
+    if isinstance(value, Base64Source):
+        return [value]
+    if isinstance(value, dict):
+        return [source for item in value.values() for source in iter_sources(item)]
+    if isinstance(value, (list, tuple)):
+        return [source for item in value for source in iter_sources(item)]
+    return []
+
+
+def _dumps(value: Any) -> bytes:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class StreamingJSONBody:
+    """JSON request body whose Base64Source fields are streamed.
+
+    Plain values are encoded as usual; every Base64Source is written as a
+    JSON string straight from storage, so a request never holds more than
+    about one chunk of document data in memory. The Content-Length is
+    computed up front so the agent does not have to accept chunked
+    uploads.
+    """
+
+    def __init__(self, value: Any, chunk_size: Optional[int] = None):
+        self.value = value
+        self.chunk_size = chunk_size or settings.agent_body_chunk_size
+
+    async def content_length(self) -> int:
+        return await self._length(self.value)
+
+    async def _length(self, value: Any) -> int:
+        if isinstance(value, Base64Source):
+            return await value.length() + 2
+        if isinstance(value, dict):
+            size = 2 + max(len(value) - 1, 0)
+            for key, item in value.items():
+                size += len(_dumps(str(key))) + 1 + await self._length(item)
+            return size
+        if isinstance(value, (list, tuple)):
+            size = 2 + max(len(value) - 1, 0)
+            for item in value:
+                size += await self._length(item)
+            return size
+        return len(_dumps(value))
+
+    async def _encode(self, value: Any) -> AsyncIterator[bytes]:
+        if isinstance(value, Base64Source):
+            yield b'"'
+            # base64 never contains characters JSON needs to escape.
+            async for chunk in value.iter_base64(self.chunk_size):
+                yield chunk.encode("ascii")
+            yield b'"'
+        elif isinstance(value, dict):
+            yield b"{"
+            for index, (key, item) in enumerate(value.items()):
+                yield (b"," if index else b"") + _dumps(str(key)) + b":"
+                async for part in self._encode(item):
+                    yield part
+            yield b"}"
+        elif isinstance(value, (list, tuple)):
+            yield b"["
+            for index, item in enumerate(value):
+                if index:
+                    yield b","
+                async for part in self._encode(item):
+                    yield part
+            yield b"]"
+        else:
+            yield _dumps(value)
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        # Coalesce the many small structural pieces into socket-sized writes.
+        buffer = bytearray()
+        async for part in self._encode(self.value):
+            buffer += part
+            if len(buffer) >= self.chunk_size:
+                yield bytes(buffer)
+                buffer.clear()
+        if buffer:
+            yield bytes(buffer)
@@ -0,0 +1,226 @@
+import datetime
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.dialects.postgresql import insert
+
+from app import models
+from app.config import settings
+from app.db import AsyncSessionLocal
+from src.agent.body import Base64Source, iter_sources
+
+logger = logging.getLogger("agent-cache")
+
+# Bump whenever the meaning of a cached response changes (prompt changes on
+# the agent, different post-processing here, ...) to invalidate old entries.
+CACHE_SCHEMA_VERSION = 1
+
+_HASH_CHUNK = 1024 * 1024
+
+
+def _update_digest(
+    digest: "hashlib._Hash",
+    value: Any,
+    sources: Optional[Dict[int, str]] = None,
+):
+    """Feed a canonical, type-tagged encoding of a JSON value to `digest`.
+
+    Equivalent to hashing ``json.dumps(value, sort_keys=True)`` but without
+    building a second copy of multi-megabyte base64 strings in memory.
+    Streamed base64 fields are represented by their content hash, looked
+    up in `sources` (id(source) -> sha256).
+    """
+    if isinstance(value, Base64Source):
+        digest.update(b"b%s:" % sources[id(value)].encode("ascii"))
+    elif isinstance(value, dict):
+        digest.update(b"{%d:" % len(value))
+        for key in sorted(value):
+            _update_digest(digest, str(key), sources)
+            _update_digest(digest, value[key], sources)
+        digest.update(b"}")
+    elif isinstance(value, (list, tuple)):
+        digest.update(b"[%d:" % len(value))
+        for item in value:
+            _update_digest(digest, item, sources)
+        digest.update(b"]")
+    elif isinstance(value, str):
+        digest.update(b"s%d:" % len(value))
+        for start in range(0, len(value), _HASH_CHUNK):
+            digest.update(value[start : start + _HASH_CHUNK].encode("utf-8"))
+    else:
+        digest.update(b"v%s:" % repr(value).encode("utf-8"))
+
+
+async def agent_cache_key(path: str, body: dict) -> str:
+    sources = {id(source): await source.digest() for source in iter_sources(body)}
+    digest = hashlib.sha256(f"v{CACHE_SCHEMA_VERSION}\0{path}\0".encode("utf-8"))
+    _update_digest(digest, body, sources)
+    return digest.hexdigest()
+
+
+class MemoryLRU:
+    """Size-bounded LRU of response bodies with a per-entry TTL."""
+
+    def __init__(self, max_bytes: int, ttl_seconds: float):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.size = 0
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            self.pop(key)
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: str, ttl_seconds: Optional[float] = None):
+        if len(value) > self.max_bytes:
+            return
+        self.pop(key)
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self.size += len(value)
+        while self.size > self.max_bytes:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self.size -= len(evicted)
+
+    def pop(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= len(entry[1])
+
+
+class AgentResponseCache:
+    """Two-level cache of successful agent responses.
+
+    The in-memory LRU answers repeated calls inside one process; the
+    `agent_response_cache` table shares entries between API and worker
+    processes and survives restarts. Entries expire after `ttl_seconds`,
+    and the table is trimmed to `db_max_bytes` (least recently hit first).
+    """
+
+    PRUNE_INTERVAL = 60
+
+    def __init__(
+        self,
+        ttl_seconds: int,
+        memory_max_bytes: int,
+        db_max_bytes: int,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.db_max_bytes = db_max_bytes
+        self.memory = MemoryLRU(memory_max_bytes, ttl_seconds)
+        self._last_prune = 0.0
+
+    async def get(self, key: str) -> Optional[str]:
+        value = self.memory.get(key)
+        if value is not None:
+            return value
+
+        now = datetime.datetime.now()
+        async with AsyncSessionLocal() as session:
+            rCache = await session.execute(
+                select(
+                    models.AgentResponseCache.response,
+                    models.AgentResponseCache.expires_at,
+                ).where(
+                    models.AgentResponseCache.key == key,
+                    models.AgentResponseCache.expires_at > now,
+                )
+            )
+            row = rCache.first()
+            if row is None:
+                return None
+            await session.execute(
+                update(models.AgentResponseCache)
+                .where(models.AgentResponseCache.key == key)
+                .values(last_hit_at=now)
+            )
+            await session.commit()
+
+        self.memory.set(key, row.response, (row.expires_at - now).total_seconds())
+        return row.response
+
+    async def set(self, key: str, endpoint: str, response: str):
+        self.memory.set(key, response)
+
+        now = datetime.datetime.now()
+        values = {
+            "endpoint": endpoint,
+            "response": response,
+            "size": len(response),
+            "created_at": now,
+            "last_hit_at": now,
+            "expires_at": now + datetime.timedelta(seconds=self.ttl_seconds),
+        }
+        async with AsyncSessionLocal() as session:
+            await session.execute(
+                insert(models.AgentResponseCache)
+                .values(key=key, **values)
+                .on_conflict_do_update(
+                    index_elements=[models.AgentResponseCache.key],
+                    set_=values,
+                )
+            )
+            await session.commit()
+
+        if time.monotonic() - self._last_prune > self.PRUNE_INTERVAL:
+            self._last_prune = time.monotonic()
+            await self.prune()
+
+    async def prune(self):
+        cache = models.AgentResponseCache
+        running_size = (
+            select(
+                cache.key,
+                func.sum(cache.size)
+                .over(order_by=cache.last_hit_at.desc())
+                .label("running_size"),
+            )
+        ).subquery()
+        async with AsyncSessionLocal() as session:
+            await session.execute(
+                delete(cache).where(cache.expires_at <= datetime.datetime.now())
+            )
+            await session.execute(
+                delete(cache).where(
+                    cache.key.in_(
+                        select(running_size.c.key).where(
+                            running_size.c.running_size > self.db_max_bytes
+                        )
+                    )
+                )
+            )
+            await session.commit()
+
+
+agent_cache = AgentResponseCache(
+    ttl_seconds=settings.agent_cache_ttl_seconds,
+    memory_max_bytes=settings.agent_cache_memory_max_bytes,
+    db_max_bytes=settings.agent_cache_db_max_bytes,
+)
+
+
+async def get_cached_response(key: str) -> Optional[str]:
+    try:
+        return await agent_cache.get(key)
+    except Exception as exc:
+        # The cache is an optimisation; never fail an agent call because of it.
+        logger.warning(f"Agent cache lookup failed: {exc}")
+        return None
+
+
+async def set_cached_response(key: str, endpoint: str, response: str):
+    try:
+        await agent_cache.set(key, endpoint, response)
+    except Exception as exc:
+        logger.warning(f"Agent cache store failed: {exc}")
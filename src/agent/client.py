@@ -0,0 +1,241 @@
+import importlib.util
+import json
+import logging
+import time
+from typing import Any, Callable, Optional, TypeVar
+
+import httpx
+
+from app.config import settings
+from src.agent.body import StreamingJSONBody
+from src.agent.cache import agent_cache_key, get_cached_response, set_cached_response
+from src.agent.limiter import CircuitOpenError, agent_circuit, agent_limiter
+from src.metrics.prometheus import AGENT_REQUEST_DURATION, AGENT_REQUESTS
+
+logger = logging.getLogger("agent-client")
+
+T = TypeVar("T")
+
+
+class AgentRequestError(Exception):
+    pass
+
+
+class AgentUnavailableError(AgentRequestError):
+    """The circuit breaker is open: the agent is considered down and the
+    request was not sent."""
+
+
+def is_agent_unavailable(exc: BaseException) -> bool:
+    while exc is not None:
+        if isinstance(exc, AgentUnavailableError):
+            return True
+        exc = exc.__cause__
+    return False
+
+
+class AgentClient:
+    """Process-wide HTTP client for the agent service.
+
+    One connection pool is shared by every job so keep-alive connections are
+    reused instead of paying a TCP/TLS handshake per job. Opened and closed
+    by the FastAPI lifespan (main.py) and by the worker entry point.
+    """
+
+    def __init__(self):
+        self._client: Optional[httpx.AsyncClient] = None
+        self.in_flight = 0
+        self.total_requests = 0
+        self._pool_stats_warned = False
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            raise RuntimeError("Agent client is not started")
+        return self._client
+
+    async def start(self):
+        if self._client is not None:
+            return
+        http2 = settings.agent_http2
+        if http2 and importlib.util.find_spec("h2") is None:
+            logger.warning("AGENT_HTTP2 is set but h2 is not installed, using HTTP/1.1")
+            http2 = False
+        self._client = httpx.AsyncClient(
+            base_url=settings.agent_url,
+            headers={"X-API-Key": settings.agent_api_key},
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=settings.agent_max_connections,
+                max_keepalive_connections=settings.agent_max_keepalive_connections,
+                keepalive_expiry=settings.agent_keepalive_expiry,
+            ),
+            timeout=httpx.Timeout(
+                connect=settings.agent_connect_timeout,
+                read=settings.agent_read_timeout,
+                write=settings.agent_write_timeout,
+                pool=settings.agent_pool_timeout,
+            ),
+        )
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def post(self, path: str, **kwargs) -> httpx.Response:
+        self.in_flight += 1
+        self.total_requests += 1
+        try:
+            return await self.client.post(path, **kwargs)
+        finally:
+            self.in_flight -= 1
+
+    def pool_stats(self) -> dict:
+        stats = {
+            "started": self._client is not None,
+            "max_connections": settings.agent_max_connections,
+            "max_keepalive_connections": settings.agent_max_keepalive_connections,
+            "in_flight_requests": self.in_flight,
+            "total_requests": self.total_requests,
+        }
+        pool = self._pool_stats()
+        if pool is not None:
+            stats.update(pool)
+        return stats
+
+    def _pool_stats(self) -> Optional[dict]:
+        """Connection counts read from httpcore's pool, None when they are
+        not available. httpx does not expose its pool, so this relies on
+        private attributes and gives up quietly if an upgrade moves them."""
+        pool = getattr(getattr(self._client, "_transport", None), "_pool", None)
+        if pool is None:
+            return None
+        try:
+            connections = list(pool.connections)
+            idle = sum(1 for connection in connections if connection.is_idle())
+            return {
+                "connections": len(connections),
+                "active_connections": len(connections) - idle,
+                "idle_connections": idle,
+                "http2_connections": sum(
+                    1 for connection in connections if "HTTP/2" in repr(connection)
+                ),
+                "waiting_requests": sum(
+                    1 for request in pool._requests if request.connection is None
+                ),
+            }
+        except Exception as exc:
+            if not self._pool_stats_warned:
+                self._pool_stats_warned = True
+                logger.warning(f"Agent connection pool stats unavailable: {exc!r}")
+            return None
+
+
+agent_client = AgentClient()
+
+
+async def post_agent(
+    client: AgentClient,
+    path: str,
+    body: dict,
+    parse: Callable[[Any], T],
+) -> T:
+    """POST `body` to the agent and return `parse` of the JSON response.
+
+    `parse` picks out what the caller needs and raises when the response
+    does not have it. A response is only cached once it parsed, so a
+    malformed 200 fails its stage without being served again from the
+    cache to every retry.
+    """
+    # The body carries everything the answer depends on (documents, reference
+    # document, llm_config), so identical bodies can share one response.
+    cache_key = (
+        await agent_cache_key(path, body) if settings.agent_cache_enabled else None
+    )
+    if cache_key:
+        cached = await get_cached_response(cache_key)
+        if cached is not None:
+            try:
+                result = parse(json.loads(cached))
+            except Exception as exc:
+                logger.warning(f"Ignoring unusable cached response {path}: {exc!r}")
+            else:
+                logger.info(f"Agent cache hit {path}")
+                AGENT_REQUESTS.labels(path, "cache_hit").inc()
+                return result
+
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        res = await _send_limited(client, path, StreamingJSONBody(body))
+        if res.status_code == 200:
+            outcome = "ok"
+    except AgentUnavailableError:
+        outcome = "unavailable"
+        raise
+    finally:
+        AGENT_REQUESTS.labels(path, outcome).inc()
+        if outcome != "unavailable":
+            AGENT_REQUEST_DURATION.labels(path, outcome).observe(
+                time.perf_counter() - started
+            )
+    if res.status_code != 200:
+        raise AgentRequestError(f"{path} responded with {res.status_code}")
+    try:
+        result = parse(res.json())
+    except Exception as exc:
+        raise AgentRequestError(
+            f"{path} returned an unusable response: {exc!r}"
+        ) from exc
+    if cache_key:
+        await set_cached_response(cache_key, path, res.text)
+    return result
+
+
+async def _send_limited(
+    client: AgentClient, path: str, body: StreamingJSONBody
+) -> httpx.Response:
+    """Send through the circuit breaker and the adaptive concurrency limit."""
+    # Known up front (lengths come from the database), so the agent gets a
+    # plain Content-Length upload instead of chunked transfer encoding.
+    headers = {
+        "Content-Type": "application/json",
+        "Content-Length": str(await body.content_length()),
+    }
+    try:
+        probe = agent_circuit.before_request()
+    except CircuitOpenError as exc:
+        raise AgentUnavailableError(str(exc)) from exc
+
+    try:
+        await agent_limiter.acquire()
+    except BaseException:
+        agent_circuit.abandon(probe)
+        raise
+
+    started = time.monotonic()
+    latency = None
+    overloaded = False
+    try:
+        # The breaker may have left "closed" while this request queued for
+        # a slot; only the probe goes through then.
+        try:
+            agent_circuit.check(probe)
+        except CircuitOpenError as exc:
+            raise AgentUnavailableError(str(exc)) from exc
+        try:
+            res = await client.post(path, content=body, headers=headers)
+        except httpx.TransportError as exc:
+            latency, overloaded = time.monotonic() - started, True
+            raise AgentRequestError(f"{path} failed: {exc!r}") from exc
+        latency = time.monotonic() - started
+        overloaded = res.status_code == 429 or res.status_code >= 500
+        return res
+    finally:
+        if latency is None:
+            # Cancelled or never sent: says nothing about the agent's health.
+            agent_circuit.abandon(probe)
+        else:
+            agent_circuit.record(success=not overloaded, probe=probe)
+        await agent_limiter.release(path, latency, overloaded)
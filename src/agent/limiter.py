@@ -0,0 +1,183 @@
+import asyncio
+import time
+from typing import Dict, Optional
+
+from app.config import settings
+
+
+class AdaptiveLimiter:
+    """AIMD limit on concurrent agent requests.
+
+    Every request reports its latency. A request is a congestion signal when
+    it failed with an overload status/transport error, or took longer than
+    `latency_tolerance` times the usual latency of its endpoint (a slow
+    EWMA). Congestion shrinks the limit multiplicatively (at most once per
+    `cooldown` seconds, so one burst of slow responses counts once);
+    healthy responses grow it by roughly one slot per full window.
+    """
+
+    def __init__(
+        self,
+        initial: int,
+        min_limit: int,
+        max_limit: int,
+        latency_tolerance: float,
+        backoff: float,
+        cooldown: float,
+    ):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.limit = float(max(min_limit, min(initial, max_limit)))
+        self.latency_tolerance = latency_tolerance
+        self.backoff = backoff
+        self.cooldown = cooldown
+        self.in_flight = 0
+        self.baseline: Dict[str, float] = {}
+        self._last_decrease = 0.0
+        self._condition = asyncio.Condition()
+
+    async def acquire(self):
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+
+    async def release(self, path: str, latency: Optional[float], overloaded: bool):
+        """Give the slot back. `latency` is None when the request was
+        abandoned (e.g. cancelled) and says nothing about the agent."""
+        async with self._condition:
+            self.in_flight -= 1
+            if latency is not None:
+                self._observe(path, latency, overloaded)
+            self._condition.notify_all()
+
+    def _observe(self, path: str, latency: float, overloaded: bool):
+        baseline = self.baseline.get(path)
+        slow = baseline is not None and latency > baseline * self.latency_tolerance
+        if not overloaded:
+            # Slow learner, so a sustained slowdown still reads as "slow".
+            self.baseline[path] = (
+                latency if baseline is None else baseline * 0.9 + latency * 0.1
+            )
+
+        now = time.monotonic()
+        if overloaded or slow:
+            if now - self._last_decrease >= self.cooldown:
+                self._last_decrease = now
+                self.limit = max(self.min_limit, self.limit * self.backoff)
+        else:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+    def stats(self) -> dict:
+        return {
+            "limit": int(self.limit),
+            "in_flight": self.in_flight,
+            "min_limit": self.min_limit,
+            "max_limit": self.max_limit,
+            "baseline_latency": {
+                path: round(value, 3) for path, value in self.baseline.items()
+            },
+        }
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class CircuitBreaker:
+    """closed -> open after `failure_threshold` consecutive failures;
+    open -> half_open after `reset_seconds`; one probe request then decides
+    between closed and open again.
+
+    `before_request` returns a probe token for the request let through as
+    the probe (None otherwise), and only the outcome reported with that
+    token moves the breaker out of half_open. Requests that started while
+    the circuit was closed and finish later do not count.
+    """
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probe: Optional[int] = None
+        self._probe_count = 0
+
+    @property
+    def retry_after(self) -> float:
+        if self.state == "closed":
+            return 0.0
+        return max(0.0, self.opened_at + self.reset_seconds - time.monotonic())
+
+    def before_request(self) -> Optional[int]:
+        if self.state == "open":
+            if self.retry_after > 0:
+                raise CircuitOpenError(
+                    f"Agent circuit open, retry in {self.retry_after:.0f}s"
+                )
+            self.state = "half_open"
+        if self.state == "half_open":
+            if self._probe is not None:
+                raise CircuitOpenError("Agent circuit half-open, probe in flight")
+            self._probe_count += 1
+            self._probe = self._probe_count
+            return self._probe
+        return None
+
+    def check(self, probe: Optional[int]):
+        """Turn away a request admitted earlier (e.g. queued for a limiter
+        slot) when the circuit is no longer closed, unless it is the probe."""
+        if self.state != "closed" and not self._is_probe(probe):
+            raise CircuitOpenError(f"Agent circuit {self.state}")
+
+    def record(self, success: bool, probe: Optional[int] = None):
+        if self._is_probe(probe):
+            self._probe = None
+            if success:
+                self.state = "closed"
+                self.failures = 0
+            else:
+                self._open()
+            return
+        if self.state != "closed":
+            return
+        if success:
+            self.failures = 0
+            return
+        self.failures += 1
+        if self.failures >= self.failure_threshold:
+            self._open()
+
+    def abandon(self, probe: Optional[int] = None):
+        # The request never got an answer (cancelled); let another probe go.
+        if self._is_probe(probe):
+            self._probe = None
+
+    def _is_probe(self, probe: Optional[int]) -> bool:
+        return probe is not None and probe == self._probe
+
+    def _open(self):
+        self.state = "open"
+        self.opened_at = time.monotonic()
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "retry_after": round(self.retry_after, 1),
+        }
+
+
+agent_limiter = AdaptiveLimiter(
+    initial=settings.agent_limiter_initial,
+    min_limit=settings.agent_limiter_min,
+    max_limit=settings.agent_limiter_max,
+    latency_tolerance=settings.agent_limiter_latency_tolerance,
+    backoff=settings.agent_limiter_backoff,
+    cooldown=settings.agent_limiter_cooldown,
+)
+
+agent_circuit = CircuitBreaker(
+    failure_threshold=settings.agent_circuit_failure_threshold,
+    reset_seconds=settings.agent_circuit_reset_seconds,
+)
@@ -1,20 +1,16 @@
 from typing import List
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, HTTPException, Request
 from app import schemas
-from sqlalchemy.ext.asyncio import AsyncSession
-from src.repository import belanja
-
-from app.db import get_session
+from src.reference.cache import reference_response
 
 
 router = APIRouter(prefix="/jenis-belanja")
 
 
 @router.get("/type", response_model=List[schemas.JenisBelanjaReadSchema])
-async def get_shopping_type(session: AsyncSession = Depends(get_session)):
+async def get_shopping_type(request: Request):
     try:
-        results = await belanja.get_jenis_belanja(session)
-        return results
+        return await reference_response(request, "jenis_belanja")
     except Exception as exc:
         raise HTTPException(status_code=500, detail=str(exc))
 
@@ -25,10 +21,9 @@ async def get_shopping_type(session: AsyncSession = Depends(get_session)):
 )
 async def get_shopping_sub_type(
     id: int,
-    session: AsyncSession = Depends(get_session),
+    request: Request,
 ):
     try:
-        results = await belanja.get_sub_jenis_belanja(session, id)
-        return results
+        return await reference_response(request, f"sub_jenis_belanja:{id}")
     except Exception as exc:
         raise HTTPException(status_code=500, detail=str(exc))
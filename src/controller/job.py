@@ -12,6 +12,8 @@ router = APIRouter(prefix="/job")
 @router.get("/{id}")
 async def get_job(
     id: int,
+    # Polled right after an upload, so it reads from the primary (a replica
+    # may not have the job yet).
     session: AsyncSession = Depends(get_session),
 ):
     return StreamingResponse(
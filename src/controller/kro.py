@@ -1,15 +1,13 @@
 from typing import List
-from fastapi import APIRouter, Depends
-from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import APIRouter, Request
 
 from app import schemas
-from app.db import get_session
 
-from src.repository import kro
+from src.reference.cache import reference_response
 
 router = APIRouter(prefix="/kro")
 
 
 @router.get("/", response_model=List[schemas.KroReadSchema])
-async def get_kro(session: AsyncSession = Depends(get_session)):
-    return await kro.get_kro(session)
+async def get_kro(request: Request):
+    return await reference_response(request, "kro")
@@ -0,0 +1,22 @@
+import logging
+
+from fastapi import APIRouter, Depends, Response
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db import get_session
+from src.metrics.prometheus import refresh_job_metrics
+
+logger = logging.getLogger("api-logger")
+
+router = APIRouter()
+
+
+@router.get("/metrics", include_in_schema=False)
+async def get_metrics(session: AsyncSession = Depends(get_session)):
+    try:
+        await refresh_job_metrics(session)
+    except Exception as exc:
+        # Still serve process metrics when the database is unreachable.
+        logger.warning(f"Failed to refresh job metrics: {exc}")
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
@@ -1,36 +1,85 @@
 import base64
+import datetime
 from typing import List, Optional
 from fastapi import (
     APIRouter,
-    BackgroundTasks,
     Depends,
-    File,
-    Form,
     HTTPException,
     Query,
-    UploadFile,
+    Request,
+    Response,
 )
+from pydantic import ValidationError
 from sqlalchemy.ext.asyncio import AsyncSession
 from app import schemas
-from app.db import get_session
+from app.config import settings
+from app.db import get_read_session, get_session
 from src.repository import proposal, proposal_job, proposal_document
-from utils import file as utils_file
+from src.storage.blob import blob_store
+from src.storage.multipart import (
+    MultipartError,
+    UploadTooLargeError,
+    receive_multipart,
+)
+from src.storage.response import blob_response, etag_matches
 from fastapi.responses import StreamingResponse
 from src.utils.converter import md_to_pdf_xhtml2pdf
 
 
 router = APIRouter(prefix="/proposal")
 
+# The upload body is parsed by hand (streamed into the blob store), so the
+# form is described for the OpenAPI docs here.
+UPLOAD_DOCUMENT_REQUEST_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "required": ["proposal_id", "kak_file", "rab_file", "sp_file"],
+                    "properties": {
+                        "proposal_id": {"type": "integer"},
+                        "kak_file": {"type": "string", "format": "binary"},
+                        "rab_file": {"type": "string", "format": "binary"},
+                        "sp_file": {"type": "string", "format": "binary"},
+                        "doc_supports": {
+                            "type": "array",
+                            "items": {"type": "string", "format": "binary"},
+                        },
+                    },
+                }
+            }
+        },
+    }
+}
+
 
-# ===============================
-# Background process Job
-# ===============================
-async def background_process_job(
+async def artifact_not_modified(
+    request: Request,
+    response: Response,
     session: AsyncSession,
-    job_id: int,
-    proposal_id: int,
-):
-    await proposal.background_process_job_agent(session, job_id, proposal_id)
+    id: int,
+    name: str,
+) -> Optional[Response]:
+    """Cache headers of a proposal artifact, set on `response`.
+
+    Outputs of a completed job only change through a retry (which fails or
+    succeeds again) or a note/status edit, all of which bump
+    proposal.artifact_version, so the job id and that version make a
+    strong ETag. Returns the 304 to send when the client's
+    copy is current, before the artifact is loaded or serialized.
+    """
+    state = await proposal.get_proposal_artifact_state(session, id)
+    if not state or state["job_status"] != "completed":
+        response.headers["Cache-Control"] = "no-store"
+        return None
+    etag = f'"{state["runtime_id"]}.{state["artifact_version"]}.{name}"'
+    headers = {"ETag": etag, "Cache-Control": settings.artifact_cache_control}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
 
 
 @router.post("/")
@@ -48,38 +97,41 @@ async def create_proposal(
         raise HTTPException(status_code=500, detail=str(exc))
 
 
-@router.post("/document")
+@router.post("/document", openapi_extra=UPLOAD_DOCUMENT_REQUEST_BODY)
 async def upload_document_proposal(
-    background_tasks: BackgroundTasks,
-    proposal_id: int = Form(...),
-    kak_file: UploadFile = File(...),
-    rab_file: UploadFile = File(...),
-    sp_file: UploadFile = File(...),
-    doc_supports: Optional[List[UploadFile]] = File([]),
+    request: Request,
     session: AsyncSession = Depends(get_session),
 ):
     is_error = False
     try:
+        # Files go straight from the socket into the blob store.
+        fields, files = await receive_multipart(
+            request,
+            blob_store,
+            max_file_size=settings.upload_max_file_size,
+            max_request_size=settings.upload_max_request_size,
+        )
         dto = schemas.ProposalDocumentUploadSchema(
-            proposal_id=proposal_id,
-            kak_file=kak_file,
-            rab_file=rab_file,
-            sp_file=sp_file,
-            doc_supports=doc_supports,
+            proposal_id=fields.get("proposal_id", [None])[0],
+            kak_file=files.get("kak_file", [None])[0],
+            rab_file=files.get("rab_file", [None])[0],
+            sp_file=files.get("sp_file", [None])[0],
+            doc_supports=files.get("doc_supports", []),
         )
 
+        # The job is created with status "queue"; worker.py picks it up.
         job = await proposal.upload_document_proposal(session, dto)
-        background_tasks.add_task(
-            background_process_job,
-            session,
-            job.id,
-            proposal_id,
-        )
 
         return {
             "message": "document uploaded",
             "data": job.id,
         }
+    except UploadTooLargeError as exc:
+        is_error = True
+        raise HTTPException(status_code=413, detail=str(exc))
+    except (MultipartError, ValidationError) as exc:
+        is_error = True
+        raise HTTPException(status_code=422, detail=str(exc))
     except Exception as exc:
         is_error = True
         raise HTTPException(status_code=500, detail=str(exc))
@@ -87,16 +139,47 @@ async def upload_document_proposal(
         if not is_error:
             await proposal.update_proposal(
                 session,
-                proposal_id,
+                dto.proposal_id,
                 schemas.ProposalUpdateSchema(runtime_id=job.id),
             )
 
 
 @router.get("/", response_model=List[schemas.ProposalListReadSchema])
-async def get_list_proposal(session: AsyncSession = Depends(get_session)):
+async def get_list_proposal(
+    response: Response,
+    limit: int = Query(
+        settings.proposal_list_page_size,
+        ge=1,
+        le=settings.proposal_list_max_page_size,
+    ),
+    cursor: Optional[str] = Query(None),
+    status: Optional[str] = Query(None),
+    jenis_belanja_id: Optional[int] = Query(None),
+    kro_id: Optional[int] = Query(None),
+    satuan_kerja: Optional[str] = Query(None),
+    created_from: Optional[datetime.date] = Query(None),
+    created_to: Optional[datetime.date] = Query(None),
+    session: AsyncSession = Depends(get_read_session),
+):
+    """Newest first. The next page is requested with ?cursor= set to the
+    X-Next-Cursor header of this one (absent on the last page)."""
     try:
-        proposals = await proposal.get_list_proposal(session)
+        proposals, next_cursor = await proposal.get_list_proposal(
+            session,
+            limit,
+            cursor=cursor,
+            status=status,
+            jenis_belanja_id=jenis_belanja_id,
+            kro_id=kro_id,
+            satuan_kerja=satuan_kerja,
+            created_from=created_from,
+            created_to=created_to,
+        )
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
         return proposals
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
     except Exception as exc:
         raise HTTPException(status_code=500, detail=str(exc))
 
@@ -104,14 +187,18 @@ async def get_list_proposal(session: AsyncSession = Depends(get_session)):
 @router.get("/{id}/verification")
 async def get_detail_proposal_verification(
     id: int,
-    session: AsyncSession = Depends(get_session),
+    request: Request,
+    response: Response,
+    session: AsyncSession = Depends(get_read_session),
 ):
     try:
-        result = await proposal.get_proposal_by_id(session, id)
-        return {
-            "message": "Success",
-            "data": result.proposal_verification if result else None,
-        }
+        not_modified = await artifact_not_modified(
+            request, response, session, id, "verification"
+        )
+        if not_modified:
+            return not_modified
+        result = await proposal.get_proposal_verification(session, id)
+        return {"message": "Success", "data": result}
     except Exception as exc:
         raise HTTPException(status_code=500, detail=str(exc))
 
@@ -119,8 +206,10 @@ async def get_detail_proposal_verification(
 @router.get("/{id}/document")
 async def get_detail_proposal_document(
     id: int,
+    request: Request,
+    response: Response,
     type: str = Query(...),
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_read_session),
 ):
     if type not in ["kak", "rab", "sp"]:
         raise HTTPException(
@@ -128,8 +217,13 @@ async def get_detail_proposal_document(
             detail="Invalid type. Should be kak, rab, or sp",
         )
     try:
+        not_modified = await artifact_not_modified(
+            request, response, session, id, f"document-{type}"
+        )
+        if not_modified:
+            return not_modified
         result = await proposal.get_proposal_document(session, id, type)
-        return {"message": "Success", "data": result.summary if result else None}
+        return {"message": "Success", "data": result}
     except Exception as exc:
         raise HTTPException(status_code=500, detail=str(exc))
 
@@ -140,9 +234,16 @@ async def get_detail_proposal_document(
 )
 async def get_detail_proposal_map_priority(
     id: int,
-    session: AsyncSession = Depends(get_session),
+    request: Request,
+    response: Response,
+    session: AsyncSession = Depends(get_read_session),
 ):
     try:
+        not_modified = await artifact_not_modified(
+            request, response, session, id, "map-priority"
+        )
+        if not_modified:
+            return not_modified
         result = await proposal.get_proposal_map_priority(session, id)
         return result
     except Exception as exc:
@@ -155,9 +256,16 @@ async def get_detail_proposal_map_priority(
 )
 async def get_detail_proposal_score_overlap(
     id: int,
-    session: AsyncSession = Depends(get_session),
+    request: Request,
+    response: Response,
+    session: AsyncSession = Depends(get_read_session),
 ):
     try:
+        not_modified = await artifact_not_modified(
+            request, response, session, id, "score-overlap"
+        )
+        if not_modified:
+            return not_modified
         result = await proposal.get_proposal_score_overlap(session, id)
         return result
     except Exception as exc:
@@ -167,15 +275,22 @@ async def get_detail_proposal_score_overlap(
 @router.get("/{id}/summary")
 async def get_detail_proposal_summary(
     id: int,
-    session: AsyncSession = Depends(get_session),
+    request: Request,
+    response: Response,
+    session: AsyncSession = Depends(get_read_session),
 ):
     try:
-        result = await proposal.get_proposal_by_id(session, id)
+        not_modified = await artifact_not_modified(
+            request, response, session, id, "summary"
+        )
+        if not_modified:
+            return not_modified
+        result = await proposal.get_proposal_summary(session, id)
         return {
             "message": "Success",
             "data": {
-                "summary": result.summary if result else None,
-                "note": result.note if result else None,
+                "summary": result["summary"] if result else None,
+                "note": result["note"] if result else None,
             },
         }
     except Exception as exc:
@@ -185,14 +300,18 @@ async def get_detail_proposal_summary(
 @router.get("/{id}/evaluation-letter")
 async def get_detail_evaluation_letter(
     id: int,
-    session: AsyncSession = Depends(get_session),
+    request: Request,
+    response: Response,
+    session: AsyncSession = Depends(get_read_session),
 ):
     try:
-        result = await proposal.get_proposal_by_id(session, id)
-        return {
-            "message": "Success",
-            "data": result.evaluasi_letter if result else None,
-        }
+        not_modified = await artifact_not_modified(
+            request, response, session, id, "evaluation-letter"
+        )
+        if not_modified:
+            return not_modified
+        result = await proposal.get_proposal_evaluation_letter_by_id(session, id)
+        return {"message": "Success", "data": result}
     except Exception as exc:
         raise HTTPException(status_code=500, detail=str(exc))
 
@@ -232,7 +351,6 @@ async def update_proposal_status(
 
 @router.post("/document/retry")
 async def retry_upload_document_proposal(
-    background_tasks: BackgroundTasks,
     input: schemas.ProposalDocumentRetrySchema,
     session: AsyncSession = Depends(get_session),
 ):
@@ -240,26 +358,27 @@ async def retry_upload_document_proposal(
         pj = await proposal_job.get_proposal_job_by_id(session, input.runtime_id)
         if not pj:
             raise HTTPException(status_code=404, detail="Proposal job not found")
-        await proposal_job.update_status_retry_proposal_job(
+        requeued = await proposal_job.update_status_retry_proposal_job(
             session,
             input.runtime_id,
             "queue",
         )
+        if not requeued:
+            raise HTTPException(
+                status_code=409,
+                detail="Proposal job is still in progress",
+            )
         await proposal.update_proposal(
             session,
             input.proposal_id,
             schemas.ProposalUpdateSchema(status="retry"),
         )
-        background_tasks.add_task(
-            background_process_job,
-            session,
-            input.runtime_id,
-            input.proposal_id,
-        )
         return {
             "message": "Retry upload document proposal in progress",
             "data": input.runtime_id,
         }
+    except HTTPException:
+        raise
     except Exception as exc:
         raise HTTPException(status_code=500, detail=str(exc))
 
@@ -267,8 +386,9 @@ async def retry_upload_document_proposal(
 @router.get("/{id}/document/download")
 async def download_document_proposal(
     id: int,
+    request: Request,
     type: str = Query(...),
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_read_session),
 ):
     try:
         if type not in ["rab", "kak"]:
@@ -283,14 +403,13 @@ async def download_document_proposal(
         )
         if not doc:
             raise HTTPException(status_code=404, detail="Document not found")
-        file_io = utils_file.decoding_file(doc.encoding_base_64)
 
-        return StreamingResponse(
-            file_io,
-            media_type="application/pdf",
-            headers={
-                "Content-Disposition": f"attachment; filename={doc.file_name}",
-            },
+        return blob_response(
+            request,
+            doc.content_sha256,
+            doc.content_size,
+            doc.content_type,
+            doc.file_name,
         )
     except Exception as exc:
         raise HTTPException(status_code=500, detail=str(exc))
@@ -299,7 +418,7 @@ async def download_document_proposal(
 @router.get("/{id}", response_model=schemas.ProposalListReadSchema)
 async def get_proposal_by_id(
     id: int,
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_read_session),
 ):
     try:
         pr = await proposal.get_proposal_detail_by_id(session, id)
@@ -307,13 +426,66 @@ async def get_proposal_by_id(
     except Exception as exc:
         raise HTTPException(status_code=500, detail=str(exc))
 
+
+@router.get("/{id}/full")
+async def get_proposal_full(
+    id: int,
+    request: Request,
+    response: Response,
+    fields: Optional[str] = Query(
+        None,
+        description="Comma separated sections (default all): "
+        + ", ".join(proposal.PROPOSAL_FULL_FIELDS),
+    ),
+    session: AsyncSession = Depends(get_read_session),
+):
+    """Everything the proposal page shows, in one request and one query."""
+    selected = (
+        [field.strip() for field in fields.split(",") if field.strip()]
+        if fields
+        else list(proposal.PROPOSAL_FULL_FIELDS)
+    )
+    unknown = [
+        field for field in selected if field not in proposal.PROPOSAL_FULL_FIELDS
+    ]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid fields: {', '.join(unknown)}. Should be "
+            + ", ".join(proposal.PROPOSAL_FULL_FIELDS),
+        )
+    # One ETag per set of sections, whatever order they were asked in.
+    name = "full:" + "+".join(
+        field for field in proposal.PROPOSAL_FULL_FIELDS if field in selected
+    )
+    try:
+        not_modified = await artifact_not_modified(request, response, session, id, name)
+        if not_modified:
+            return not_modified
+        result = await proposal.get_proposal_full(session, id, selected)
+    except Exception as exc:
+        raise HTTPException(status_code=500, detail=str(exc))
+    if result is None:
+        raise HTTPException(status_code=404, detail="Proposal not found")
+    return {"message": "Success", "data": result}
+
+
 @router.get("/{id}/evaluation-letter/download")
 async def download_detail_evaluation_letter(
     id: int,
-    session: AsyncSession = Depends(get_session),
+    request: Request,
+    response: Response,
+    session: AsyncSession = Depends(get_read_session),
 ):
     try:
-        result = await proposal.get_proposal_by_id(session, id)
+        not_modified = await artifact_not_modified(
+            request, response, session, id, "evaluation-letter-pdf"
+        )
+        if not_modified:
+            return not_modified
+        evaluasi_letter = await proposal.get_proposal_evaluation_letter_by_id(
+            session, id
+        )
         sample_md = r"""
 ## BERITA ACARA HASIL EVALUASI PROPOSAL
 
@@ -404,9 +576,9 @@ Mengetahui,
 """
         decoded_value = None
         try:
-            decoded_value = base64.b64decode(result.evaluasi_letter.encode("utf-8")).decode("utf-8")
+            decoded_value = base64.b64decode(evaluasi_letter.encode("utf-8")).decode("utf-8")
         except Exception:
-            decoded_value = result.evaluasi_letter
+            decoded_value = evaluasi_letter
 
         pdf_stream = md_to_pdf_xhtml2pdf(
             decoded_value,
@@ -436,6 +608,7 @@ Mengetahui,
             pdf_stream,
             media_type="application/pdf",
             headers={
+                **response.headers,
                 "Content-Disposition": f"attachment; filename=Berita Acara Hasil Evaluasi Proposal.pdf",
             },
         )
@@ -0,0 +1,15 @@
+from fastapi import APIRouter, HTTPException
+
+from src.reference.cache import reference_cache
+
+router = APIRouter(prefix="/reference")
+
+
+@router.post("/invalidate")
+async def invalidate_reference_cache():
+    """Reload KRO and jenis belanja in this process after editing them."""
+    try:
+        await reference_cache.refresh()
+        return {"message": "Success"}
+    except Exception as exc:
+        raise HTTPException(status_code=500, detail=str(exc))
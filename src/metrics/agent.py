@@ -0,0 +1,96 @@
+from prometheus_client import REGISTRY
+from prometheus_client.core import GaugeMetricFamily
+from prometheus_client.registry import Collector
+
+from src.agent.client import agent_client
+from src.agent.limiter import agent_circuit, agent_limiter
+
+CIRCUIT_STATES = ("closed", "open", "half_open")
+
+
+class AgentCollector(Collector):
+    """Agent connection pool, concurrency limit and circuit breaker of this
+    process. Only meaningful where the pipeline runs (worker.py, or the API
+    with EMBEDDED_WORKER), which is where it is registered."""
+
+    def collect(self):
+        pool = agent_client.pool_stats()
+        yield GaugeMetricFamily(
+            "agent_pool_max_connections",
+            "Configured agent connection pool size",
+            value=pool["max_connections"],
+        )
+        yield GaugeMetricFamily(
+            "agent_requests_in_flight",
+            "Agent requests waiting for or holding a connection",
+            value=pool["in_flight_requests"],
+        )
+        if "connections" in pool:
+            connections = GaugeMetricFamily(
+                "agent_pool_connections",
+                "Open agent connections by state",
+                labels=["state"],
+            )
+            connections.add_metric(["active"], pool["active_connections"])
+            connections.add_metric(["idle"], pool["idle_connections"])
+            yield connections
+            yield GaugeMetricFamily(
+                "agent_pool_http2_connections",
+                "Open agent connections speaking HTTP/2",
+                value=pool["http2_connections"],
+            )
+            yield GaugeMetricFamily(
+                "agent_pool_waiting_requests",
+                "Agent requests queued for a pooled connection",
+                value=pool["waiting_requests"],
+            )
+
+        limiter = agent_limiter.stats()
+        yield GaugeMetricFamily(
+            "agent_limiter_limit",
+            "Current adaptive concurrency limit for agent requests",
+            value=limiter["limit"],
+        )
+        yield GaugeMetricFamily(
+            "agent_limiter_in_flight",
+            "Agent requests holding a limiter slot",
+            value=limiter["in_flight"],
+        )
+        baseline = GaugeMetricFamily(
+            "agent_limiter_baseline_latency_seconds",
+            "Usual latency of each agent endpoint (slow EWMA)",
+            labels=["endpoint"],
+        )
+        for path, value in limiter["baseline_latency"].items():
+            baseline.add_metric([path], value)
+        yield baseline
+
+        circuit = agent_circuit.stats()
+        state = GaugeMetricFamily(
+            "agent_circuit_state",
+            "1 for the agent circuit breaker's current state",
+            labels=["state"],
+        )
+        for name in CIRCUIT_STATES:
+            state.add_metric([name], 1 if circuit["state"] == name else 0)
+        yield state
+        yield GaugeMetricFamily(
+            "agent_circuit_consecutive_failures",
+            "Consecutive failed agent requests",
+            value=circuit["consecutive_failures"],
+        )
+        yield GaugeMetricFamily(
+            "agent_circuit_retry_after_seconds",
+            "Seconds until an open circuit lets a probe through",
+            value=circuit["retry_after"],
+        )
+
+
+_registered = False
+
+
+def register_agent_metrics():
+    global _registered
+    if not _registered:
+        REGISTRY.register(AgentCollector())
+        _registered = True
@@ -0,0 +1,114 @@
+import datetime
+
+from prometheus_client import REGISTRY, Counter, Gauge, Histogram
+from prometheus_client.core import GaugeMetricFamily
+from prometheus_client.registry import Collector
+from sqlalchemy import func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import models
+from app.db import engine, replica_engine
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+AGENT_BUCKETS = (0.5, 1, 2.5, 5, 10, 20, 30, 60, 90, 120, 180, 240, 300)
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+HTTP_REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "HTTP requests currently being served",
+)
+
+AGENT_REQUEST_DURATION = Histogram(
+    "agent_request_duration_seconds",
+    "Agent service call latency",
+    ["endpoint", "outcome"],
+    buckets=AGENT_BUCKETS,
+)
+AGENT_REQUESTS = Counter(
+    "agent_requests_total",
+    "Agent service calls by outcome (ok, error, unavailable, cache_hit)",
+    ["endpoint", "outcome"],
+)
+
+PIPELINE_STAGE_DURATION = Histogram(
+    "pipeline_stage_duration_seconds",
+    "Proposal pipeline stage latency",
+    ["stage", "status"],
+    buckets=AGENT_BUCKETS,
+)
+PIPELINE_STAGES = Counter(
+    "pipeline_stages_total",
+    "Proposal pipeline stage runs by final status",
+    ["stage", "status"],
+)
+
+PROPOSAL_JOBS = Gauge(
+    "proposal_jobs",
+    "proposal_job rows by status",
+    ["status", "is_error"],
+)
+PROPOSAL_JOB_QUEUE_DEPTH = Gauge(
+    "proposal_job_queue_depth",
+    "Jobs a worker could claim right now",
+)
+
+
+class DbPoolCollector(Collector):
+    def collect(self):
+        pools = {"primary": engine.pool}
+        if replica_engine is not None:
+            pools["replica"] = replica_engine.pool
+        for name, doc, value in (
+            ("db_pool_size", "Configured pool size", lambda pool: pool.size()),
+            (
+                "db_pool_checked_out",
+                "Connections in use",
+                lambda pool: pool.checkedout(),
+            ),
+            (
+                "db_pool_checked_in",
+                "Idle pooled connections",
+                lambda pool: pool.checkedin(),
+            ),
+            (
+                "db_pool_overflow",
+                "Connections above pool size",
+                lambda pool: max(pool.overflow(), 0),
+            ),
+        ):
+            family = GaugeMetricFamily(name, doc, labels=["pool"])
+            for label, pool in pools.items():
+                family.add_metric([label], value(pool))
+            yield family
+
+
+REGISTRY.register(DbPoolCollector())
+
+
+async def refresh_job_metrics(session: AsyncSession):
+    rJobs = await session.execute(
+        select(
+            models.ProposalJob.status,
+            models.ProposalJob.is_error,
+            func.count(),
+        ).group_by(models.ProposalJob.status, models.ProposalJob.is_error)
+    )
+    PROPOSAL_JOBS.clear()
+    for status, is_error, count in rJobs:
+        PROPOSAL_JOBS.labels(status, str(bool(is_error)).lower()).set(count)
+
+    rQueue = await session.execute(
+        select(func.count()).where(
+            models.ProposalJob.status == "queue",
+            or_(
+                models.ProposalJob.scheduled_at.is_(None),
+                models.ProposalJob.scheduled_at <= datetime.datetime.now(),
+            ),
+        )
+    )
+    PROPOSAL_JOB_QUEUE_DEPTH.set(rQueue.scalar_one())
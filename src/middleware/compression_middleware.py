@@ -0,0 +1,144 @@
+from starlette.datastructures import Headers, MutableHeaders
+
+from app.config import settings
+from src.agent.cache import MemoryLRU
+from src.storage.compression import (
+    add_vary,
+    codecs,
+    is_compressible,
+    negotiate_encoding,
+    weak_etag,
+)
+
+
+class CompressionMiddleware:
+    """Compresses text and JSON responses with the client's best encoding
+    (zstd, br or gzip).
+
+    Bodies under COMPRESSION_MINIMUM_SIZE, other media types (PDFs and
+    other downloads, event streams), range responses and responses that
+    are already encoded pass through untouched. Streamed responses are
+    compressed chunk by chunk. Compressed copies of ETagged responses are
+    kept in memory, so a hot artifact is compressed once, not on every hit.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.cache = MemoryLRU(
+            settings.compression_cache_max_bytes,
+            settings.compression_cache_ttl_seconds,
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        codec = codecs[encoding]
+        start = None
+        passthrough = False
+        compressor = None
+        buffer = None
+
+        def encode_headers(headers: MutableHeaders):
+            headers["Content-Encoding"] = encoding
+            headers["Vary"] = add_vary(headers.get("vary"))
+            if "etag" in headers:
+                headers["ETag"] = weak_etag(headers["etag"])
+
+        async def send_wrapper(message):
+            nonlocal start, passthrough, compressor, buffer
+            if passthrough:
+                await send(message)
+                return
+
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                if (
+                    message["status"] < 200
+                    or message["status"] in (204, 206, 304)
+                    or "content-encoding" in headers
+                    or "content-range" in headers
+                    or "no-transform" in headers.get("cache-control", "")
+                    or not is_compressible(headers.get("content-type", ""))
+                ):
+                    passthrough = True
+                    await send(message)
+                    return
+                # Held until the first body chunk shows how big the body is.
+                start = message
+                return
+
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if compressor is not None:
+                data = compressor.compress(body) if body else b""
+                if not more_body:
+                    data += compressor.finish()
+                await send(
+                    {"type": "http.response.body", "body": data, "more_body": more_body}
+                )
+                return
+
+            headers = MutableHeaders(raw=start["headers"])
+            if buffer is None and more_body:
+                content_length = headers.get("content-length", "")
+                size = int(content_length) if content_length.isdigit() else None
+                if size is not None and size < settings.compression_minimum_size:
+                    passthrough = True
+                    await send(start)
+                    await send(message)
+                    return
+                if size is None or size > settings.compression_buffer_max_bytes:
+                    encode_headers(headers)
+                    del headers["Content-Length"]
+                    compressor = codec.compressor()
+                    await send(start)
+                    await send(
+                        {
+                            "type": "http.response.body",
+                            "body": compressor.compress(body) if body else b"",
+                            "more_body": True,
+                        }
+                    )
+                    return
+                # A known, bounded size (e.g. re-streamed by the logging
+                # middleware): collect it and compress it in one go.
+                buffer = bytearray()
+
+            if buffer is not None:
+                buffer.extend(body)
+                if more_body:
+                    return
+                body = bytes(buffer)
+
+            if len(body) < settings.compression_minimum_size:
+                passthrough = True
+                await send(start)
+                await send({"type": "http.response.body", "body": body})
+                return
+            etag = headers.get("etag")
+            key = None
+            if etag and not etag.startswith("W/"):
+                query = scope.get("query_string", b"").decode("latin-1")
+                key = f"{encoding} {scope['path']}?{query} {etag}"
+            compressed = self.cache.get(key) if key else None
+            if compressed is None:
+                compressed = codec.compress(body)
+                if key:
+                    self.cache.set(key, compressed)
+            encode_headers(headers)
+            headers["Content-Length"] = str(len(compressed))
+            await send(start)
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_wrapper)
@@ -15,11 +15,16 @@ class LoggingMiddleware(BaseHTTPMiddleware):
         start_time = time.time()
 
         # --- Log Request ---
-        try:
-            body = await request.body()
-            body_text = body.decode("utf-8") if body else None
-        except Exception:
-            body_text = None
+        if request.headers.get("content-type", "").startswith("multipart/"):
+            # Uploads are streamed into the blob store; reading them here
+            # would buffer every file in memory.
+            body_text = f"<multipart, {request.headers.get('content-length')} bytes>"
+        else:
+            try:
+                body = await request.body()
+                body_text = body.decode("utf-8") if body else None
+            except Exception:
+                body_text = None
 
         logger.info(
             f"\n\n"
@@ -34,6 +39,20 @@ class LoggingMiddleware(BaseHTTPMiddleware):
 
         # --- Log Response ---
         process_time = (time.time() - start_time) * 1000
+        content_type = response.headers.get("content-type", "")
+        if not content_type.startswith(("application/json", "text/plain", "text/html")):
+            # Files, event streams, ...: pass them through untouched instead of
+            # buffering the whole body just to log it.
+            logger.info(
+                f"\n\n"
+                f"RESPONSE: status={response.status_code} "
+                f"Time={process_time:.2f}ms "
+                f"Body=<{content_type or 'no content-type'}, "
+                f"{response.headers.get('content-length', 'streamed')} bytes>"
+                f"\n"
+            )
+            return response
+
         try:
             response_body = b""
             async for chunk in response.body_iterator:
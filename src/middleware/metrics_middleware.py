@@ -0,0 +1,38 @@
+import time
+
+from src.metrics.prometheus import HTTP_REQUEST_DURATION, HTTP_REQUESTS_IN_PROGRESS
+
+
+class MetricsMiddleware:
+    """Records request latency labelled by route template (e.g.
+    /api/proposal/{id}/summary) so ids don't explode label cardinality."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        HTTP_REQUESTS_IN_PROGRESS.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_REQUESTS_IN_PROGRESS.dec()
+            # FastAPI's router stores the matched route in the shared scope.
+            route = scope.get("route")
+            HTTP_REQUEST_DURATION.labels(
+                scope["method"],
+                getattr(route, "path", "<unmatched>"),
+                str(status_code),
+            ).observe(time.perf_counter() - started)
@@ -0,0 +1,201 @@
+import asyncio
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+StageRunner = Callable[..., Awaitable[Any]]
+
+
+@dataclass(frozen=True)
+class Stage:
+    """A single node of the pipeline graph.
+
+    `run` is awaited as ``run(context, **inputs)`` where every name in
+    `inputs` is either a seed value or the output of another stage. The
+    value returned by `run` becomes the output published under `name`.
+    """
+
+    name: str
+    run: StageRunner
+    inputs: Tuple[str, ...] = ()
+    error_message: str = "Unknown error"
+
+
+class StageHooks:
+    """Lifecycle callbacks for `run_stage_graph`.
+
+    Hooks are awaited from the scheduler itself, one at a time, so they may
+    safely touch state that is not concurrency-safe (e.g. an AsyncSession).
+    An exception raised by `started` or `done` counts as a failure of that
+    stage.
+    """
+
+    async def started(self, stage: Stage):
+        pass
+
+    async def done(self, stage: Stage, output: Any):
+        pass
+
+    async def failed(self, stage: Stage, exc: BaseException):
+        pass
+
+    async def skipped(self, stage: Stage):
+        pass
+
+
+class PartialStageFailure(Exception):
+    """Raised by a stage that failed but still produced something worth
+    keeping (e.g. the documents that did get summarized)."""
+
+    def __init__(self, message: str, output: Any):
+        super().__init__(message)
+        self.output = output
+
+
+@dataclass
+class StageGraphResult:
+    outputs: Dict[str, Any] = field(default_factory=dict)
+    failed: Dict[str, BaseException] = field(default_factory=dict)
+    skipped: List[str] = field(default_factory=list)
+    resumed: List[str] = field(default_factory=list)
+
+    @property
+    def is_error(self) -> bool:
+        return bool(self.failed or self.skipped)
+
+
+class StageGraphError(Exception):
+    pass
+
+
+def validate_stage_graph(stages: Iterable[Stage], seeds: Iterable[str]) -> None:
+    stages = list(stages)
+    names = [stage.name for stage in stages]
+    duplicates = {name for name in names if names.count(name) > 1}
+    if duplicates:
+        raise StageGraphError(f"Duplicate stage names: {sorted(duplicates)}")
+
+    known = set(names) | set(seeds)
+    for stage in stages:
+        missing = [name for name in stage.inputs if name not in known]
+        if missing:
+            raise StageGraphError(f"Stage {stage.name} has unknown inputs {missing}")
+
+    # Kahn's algorithm, only to prove there is no cycle.
+    remaining = {stage.name: set(stage.inputs) & set(names) for stage in stages}
+    while remaining:
+        ready = [name for name, deps in remaining.items() if not deps]
+        if not ready:
+            raise StageGraphError(f"Cycle between stages {sorted(remaining)}")
+        for name in ready:
+            remaining.pop(name)
+        for deps in remaining.values():
+            deps.difference_update(ready)
+
+
+def downstream_of(stages: Iterable[Stage], name: str) -> Set[str]:
+    dependents: Dict[str, Set[str]] = {}
+    for stage in stages:
+        for dep in stage.inputs:
+            dependents.setdefault(dep, set()).add(stage.name)
+
+    result: Set[str] = set()
+    queue = [name]
+    while queue:
+        for child in dependents.get(queue.pop(), ()):
+            if child not in result:
+                result.add(child)
+                queue.append(child)
+    return result
+
+
+async def run_stage_graph(
+    stages: List[Stage],
+    seeds: Dict[str, Any],
+    context: Any = None,
+    hooks: Optional[StageHooks] = None,
+    completed: Optional[Dict[str, Any]] = None,
+) -> StageGraphResult:
+    """Run `stages` as soon as their inputs are available.
+
+    Independent stages run concurrently. When a stage fails, every stage
+    that (transitively) depends on it is skipped; unrelated branches keep
+    running. Stages listed in `completed` (name -> output, e.g. checkpoints
+    of an earlier attempt) are not run again, their outputs are reused.
+    """
+    validate_stage_graph(stages, seeds)
+    hooks = hooks or StageHooks()
+    completed = {
+        name: output
+        for name, output in (completed or {}).items()
+        if name in {stage.name for stage in stages}
+    }
+
+    values: Dict[str, Any] = {**seeds, **completed}
+    pending: Dict[str, Stage] = {
+        stage.name: stage for stage in stages if stage.name not in completed
+    }
+    running: Dict[asyncio.Task, Stage] = {}
+    result = StageGraphResult(outputs=dict(completed), resumed=list(completed))
+
+    async def fail(stage: Stage, exc: BaseException):
+        result.failed[stage.name] = exc
+        await hooks.failed(stage, exc)
+        for name in downstream_of(stages, stage.name):
+            skipped = pending.pop(name, None)
+            if skipped is not None:
+                result.skipped.append(name)
+                await hooks.skipped(skipped)
+
+    try:
+        while pending or running:
+            for stage in list(pending.values()):
+                if stage.name not in pending:
+                    continue
+                if not all(name in values for name in stage.inputs):
+                    continue
+                pending.pop(stage.name)
+                try:
+                    await hooks.started(stage)
+                except Exception as hook_exc:
+                    await fail(stage, hook_exc)
+                    continue
+                inputs = {name: values[name] for name in stage.inputs}
+                task = asyncio.create_task(
+                    stage.run(context, **inputs),
+                    name=f"stage:{stage.name}",
+                )
+                running[task] = stage
+
+            if not running:
+                # Whatever is left waits on a stage that never produced output.
+                for stage in pending.values():
+                    result.skipped.append(stage.name)
+                    await hooks.skipped(stage)
+                break
+
+            done, _ = await asyncio.wait(
+                running.keys(),
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            for task in done:
+                stage = running.pop(task)
+                exc = task.exception()
+                if exc is not None:
+                    await fail(stage, exc)
+                    continue
+
+                output = task.result()
+                try:
+                    await hooks.done(stage, output)
+                except Exception as hook_exc:
+                    await fail(stage, hook_exc)
+                    continue
+                values[stage.name] = output
+                result.outputs[stage.name] = output
+    finally:
+        for task in running:
+            task.cancel()
+        if running:
+            await asyncio.gather(*running, return_exceptions=True)
+
+    return result
@@ -0,0 +1,168 @@
+import asyncio
+import logging
+import os
+import socket
+from typing import Optional, Set
+
+from app import models
+from app.config import settings
+from app.db import AsyncSessionLocal
+from src.repository import proposal, proposal_job
+from src.storage.blob import blob_store
+from src.storage.sweep import sweep_unreferenced_blobs
+
+logger = logging.getLogger("proposal-worker")
+
+
+def get_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+async def keep_lease(job_id: int, worker_id: str):
+    interval = max(settings.job_lease_seconds / 3, 1)
+    while True:
+        await asyncio.sleep(interval)
+        async with AsyncSessionLocal() as session:
+            if not await proposal_job.renew_proposal_job_lease(
+                session, job_id, worker_id
+            ):
+                logger.warning(f"Lost lease on proposal job {job_id}")
+                return
+
+
+async def process_job(pj: models.ProposalJob, worker_id: str):
+    logger.info(
+        f"Worker {worker_id} picked proposal job {pj.id} (attempt {pj.attempts})"
+    )
+    lease = asyncio.create_task(keep_lease(pj.id, worker_id))
+    requeue = False
+    try:
+        if pj.attempts > settings.job_max_attempts:
+            async with AsyncSessionLocal() as session:
+                await proposal_job.fail_proposal_job(
+                    session,
+                    pj.id,
+                    f"Job abandoned after {pj.attempts - 1} attempts",
+                )
+            return
+
+        async with AsyncSessionLocal() as session:
+            await proposal.background_process_job_agent(
+                session,
+                pj.id,
+                pj.proposal_id,
+            )
+    except asyncio.CancelledError:
+        # Shutdown deadline hit: hand the job back instead of leaving it to
+        # wait out its lease.
+        requeue = True
+        raise
+    except Exception as exc:
+        logger.exception(f"Proposal job {pj.id} crashed")
+        async with AsyncSessionLocal() as session:
+            await proposal_job.fail_proposal_job(session, pj.id, str(exc))
+    finally:
+        lease.cancel()
+        async with AsyncSessionLocal() as session:
+            await proposal_job.release_proposal_job(
+                session,
+                pj.id,
+                worker_id,
+                requeue=requeue,
+            )
+
+
+async def sweep_blobs(stop: asyncio.Event):
+    while not stop.is_set():
+        try:
+            await sweep_unreferenced_blobs(
+                blob_store, settings.blob_sweep_grace_seconds
+            )
+        except Exception:
+            logger.exception("Blob sweep failed")
+        try:
+            await asyncio.wait_for(stop.wait(), settings.blob_sweep_interval_seconds)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def acquire_slot(slots: asyncio.Semaphore, stop: asyncio.Event) -> bool:
+    """Wait for a free slot. False, holding no slot, once `stop` is set
+    first: a worker that is shutting down must not claim another job when
+    one of its jobs finishes."""
+    acquire = asyncio.create_task(slots.acquire())
+    stopping = asyncio.create_task(stop.wait())
+    await asyncio.wait({acquire, stopping}, return_when=asyncio.FIRST_COMPLETED)
+    stopping.cancel()
+    if not stop.is_set():
+        return True
+    if acquire.done():
+        slots.release()
+    else:
+        acquire.cancel()
+    return False
+
+
+async def run_worker(
+    stop: asyncio.Event,
+    concurrency: Optional[int] = None,
+):
+    """Claim and process proposal jobs until `stop` is set.
+
+    In-flight jobs get `worker_shutdown_timeout` seconds to finish once
+    `stop` is set; whatever is still running after that is cancelled and
+    put back on the queue for another worker. Workers read the uploaded
+    documents from the blob store, so on other nodes than the API they need
+    the same BLOB_STORE_PATH volume mounted. Unreferenced blobs are swept
+    every `blob_sweep_interval_seconds`.
+    """
+    worker_id = get_worker_id()
+    slots = asyncio.Semaphore(concurrency or settings.worker_concurrency)
+    tasks: Set[asyncio.Task] = set()
+    sweeper = (
+        asyncio.create_task(sweep_blobs(stop))
+        if settings.blob_sweep_interval_seconds
+        else None
+    )
+    logger.info(f"Worker {worker_id} started")
+
+    while not stop.is_set():
+        if not await acquire_slot(slots, stop):
+            break
+        try:
+            async with AsyncSessionLocal() as session:
+                pj = await proposal_job.claim_next_proposal_job(
+                    session,
+                    worker_id,
+                    settings.job_lease_seconds,
+                )
+        except Exception:
+            logger.exception("Failed to claim proposal job")
+            pj = None
+
+        if not pj:
+            slots.release()
+            try:
+                await asyncio.wait_for(stop.wait(), settings.worker_poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            continue
+
+        task = asyncio.create_task(process_job(pj, worker_id))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+        task.add_done_callback(lambda _: slots.release())
+
+    if tasks:
+        logger.info(f"Worker {worker_id} draining {len(tasks)} job(s)")
+        _, still_running = await asyncio.wait(
+            tasks,
+            timeout=settings.worker_shutdown_timeout,
+        )
+        for task in still_running:
+            task.cancel()
+        await asyncio.gather(*still_running, return_exceptions=True)
+    if sweeper:
+        sweeper.cancel()
+        await asyncio.gather(sweeper, return_exceptions=True)
+    logger.info(f"Worker {worker_id} stopped")
@@ -0,0 +1,135 @@
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from fastapi import Request
+from fastapi.responses import Response
+from pydantic import BaseModel
+
+from app import schemas
+from app.config import settings
+from app.db import ReadSessionLocal
+from src.repository.belanja import get_jenis_belanja, get_sub_jenis_belanja
+from src.repository.kro import get_kro
+from src.storage.compression import negotiate_encoding, precompress, weak_etag
+from src.storage.response import etag_matches
+
+logger = logging.getLogger("reference-cache")
+
+# Retry delay after a failed reload; the previous data keeps being served.
+_RETRY_SECONDS = 30
+
+
+@dataclass(frozen=True)
+class CachedBody:
+    body: bytes
+    etag: str
+    # The body compressed once per encoding (see src/storage/compression.py).
+    encoded: Dict[str, bytes] = field(default_factory=dict)
+
+
+def _cached_body(items: List[BaseModel]) -> CachedBody:
+    body = json.dumps(
+        [item.model_dump(mode="json") for item in items],
+        ensure_ascii=False,
+        separators=(",", ":"),
+    ).encode("utf-8")
+    return CachedBody(
+        body=body,
+        etag=f'"{hashlib.sha256(body).hexdigest()[:32]}"',
+        encoded=precompress(body),
+    )
+
+
+EMPTY = _cached_body([])
+
+
+class ReferenceCache:
+    """KRO and jenis/sub-jenis belanja, held in memory as ready JSON bodies.
+
+    These tables change a few times a year and are fetched on every form
+    load, so the endpoints answer from here without a DB session. The data
+    is loaded at startup and reloaded in the background once it is older
+    than REFERENCE_CACHE_TTL_SECONDS (requests keep getting the previous
+    bodies meanwhile); `refresh` reloads it immediately. Each process has
+    its own copy, so an invalidation reaches the others through the TTL.
+    """
+
+    def __init__(self, ttl_seconds: int):
+        self.ttl_seconds = ttl_seconds
+        self._bodies: Dict[str, CachedBody] = {}
+        self._expires_at = 0.0
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    async def _load(self) -> Dict[str, CachedBody]:
+        bodies: Dict[str, CachedBody] = {}
+        async with ReadSessionLocal() as session:
+            kro = await get_kro(session)
+            bodies["kro"] = _cached_body(
+                [schemas.KroReadSchema.model_validate(each) for each in kro]
+            )
+            jenis_belanja = await get_jenis_belanja(session)
+            bodies["jenis_belanja"] = _cached_body(
+                [
+                    schemas.JenisBelanjaReadSchema.model_validate(each)
+                    for each in jenis_belanja
+                ]
+            )
+            for each in jenis_belanja:
+                sub_jenis_belanja = await get_sub_jenis_belanja(session, each.id)
+                bodies[f"sub_jenis_belanja:{each.id}"] = _cached_body(
+                    [
+                        schemas.SubJenisBelanjaReadOptionSchema.model_validate(sub)
+                        for sub in sub_jenis_belanja
+                    ]
+                )
+        return bodies
+
+    async def refresh(self):
+        async with self._lock:
+            self._bodies = await self._load()
+            self._expires_at = time.monotonic() + self.ttl_seconds
+        logger.info(f"Reference data loaded ({len(self._bodies)} bodies)")
+
+    async def _refresh_in_background(self):
+        try:
+            await self.refresh()
+        except Exception:
+            logger.exception("Reference data reload failed")
+            self._expires_at = time.monotonic() + _RETRY_SECONDS
+
+    async def get(self, key: str) -> CachedBody:
+        if not self._bodies:
+            # Not loaded (startup failed): load in the request this once.
+            await self.refresh()
+        elif time.monotonic() >= self._expires_at and (
+            self._task is None or self._task.done()
+        ):
+            self._task = asyncio.create_task(self._refresh_in_background())
+        return self._bodies.get(key, EMPTY)
+
+
+reference_cache = ReferenceCache(settings.reference_cache_ttl_seconds)
+
+
+async def reference_response(request: Request, key: str) -> Response:
+    cached = await reference_cache.get(key)
+    encoding = negotiate_encoding(request.headers.get("accept-encoding"))
+    body = cached.encoded.get(encoding) if encoding else None
+    headers = {
+        "ETag": cached.etag if body is None else weak_etag(cached.etag),
+        "Cache-Control": settings.reference_cache_control,
+        "Vary": "Accept-Encoding",
+    }
+    if etag_matches(request.headers.get("if-none-match"), cached.etag):
+        return Response(status_code=304, headers=headers)
+    if body is None:
+        body = cached.body
+    else:
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type="application/json", headers=headers)
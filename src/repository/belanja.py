@@ -5,7 +5,7 @@ from typing import List
 
 
 async def get_jenis_belanja(session: AsyncSession) -> List[models.JenisBelanja] | None:
-    q = select(models.JenisBelanja)
+    q = select(models.JenisBelanja).order_by(models.JenisBelanja.id)
     result = await session.execute(q)
     return result.scalars().all()
 
@@ -14,8 +14,10 @@ async def get_sub_jenis_belanja(
     session: AsyncSession,
     id: int,
 ) -> List[models.SubJenisBelanja] | None:
-    q = select(models.SubJenisBelanja).where(
-        models.SubJenisBelanja.jenis_belanja_id == id
+    q = (
+        select(models.SubJenisBelanja)
+        .where(models.SubJenisBelanja.jenis_belanja_id == id)
+        .order_by(models.SubJenisBelanja.id)
     )
     result = await session.execute(q)
     return result.scalars().all()
@@ -0,0 +1,41 @@
+from typing import List, Set
+from sqlalchemy import or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import models
+
+
+async def get_referenced_blobs(
+    session: AsyncSession,
+    hashes: List[str],
+) -> Set[str]:
+    """The subset of `hashes` still in use: by a document, an overlap RAB
+    attachment, or an overlap stage checkpoint of a job not yet completed."""
+    referenced = set()
+    for column in (
+        models.ProposalDocument.content_sha256,
+        models.ProposalScoreOverlap.content_sha256,
+    ):
+        rBlob = await session.execute(select(column).where(column.in_(hashes)))
+        referenced.update(rBlob.scalars().all())
+
+    remaining = [sha256 for sha256 in hashes if sha256 not in referenced]
+    if remaining:
+        rOutput = await session.execute(
+            select(models.ProposalJobStage.output).where(
+                models.ProposalJobStage.stage == "overlap",
+                or_(
+                    *[
+                        models.ProposalJobStage.output.contains(sha256)
+                        for sha256 in remaining
+                    ]
+                ),
+            )
+        )
+        outputs = rOutput.scalars().all()
+        referenced.update(
+            sha256
+            for sha256 in remaining
+            if any(sha256 in output for output in outputs)
+        )
+    return referenced
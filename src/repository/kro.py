@@ -5,6 +5,6 @@ from typing import List
 
 
 async def get_kro(session: AsyncSession) -> List[models.Kro] | None:
-    q = select(models.Kro)
+    q = select(models.Kro).order_by(models.Kro.id)
     result = await session.execute(q)
     return result.scalars().all()
@@ -3,25 +3,50 @@ import asyncio
 import base64
 import datetime
 import json
-import httpx
+import time
 
-from sqlalchemy import select, text
-from sqlalchemy.orm import joinedload
+from dataclasses import dataclass
+from sqlalchemy import JSON, func, select, tuple_, update
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from sqlalchemy.orm import joinedload, undefer, undefer_group
 from typing import Any, AsyncGenerator, List, Optional, Tuple
-from fastapi import UploadFile
 from sqlalchemy.ext.asyncio import AsyncSession
 from app import models, schemas
 from app.config import settings
+from src.agent.body import Base64Source, BlobBase64Source
+from src.agent.client import (
+    AgentClient,
+    AgentRequestError,
+    AgentUnavailableError,
+    agent_client,
+    is_agent_unavailable,
+    post_agent,
+)
 from src.constant.globals import USER_ID
+from src.metrics.prometheus import PIPELINE_STAGE_DURATION, PIPELINE_STAGES
+from src.pipeline.scheduler import (
+    PartialStageFailure,
+    Stage,
+    StageHooks,
+    run_stage_graph,
+)
+from src.repository import proposal_job, proposal_job_stage
+from src.storage.blob import blob_store, put_bytes
 from utils.clear import clear_markdown
 from utils.converter import format_rupiah, string_to_float
 
-MAP_PRIORITY_FILE_NAME = {
-    "apr-spbe.md": "ARSITEKTUR DAN PETA RENCANA SPBE",
-    "renja.md": "RENCANA KERJA",
-    "renstra.md": "RENCANA STRATEGIS",
-    "tusi.md": "TUGAS DAN FUNGSI",
-}
+# Generate Summary
+AGENT_PATH_SUMMARY = "/api/v1/parse-single-base64"
+# Generate Assess Document | Allignment Assessor
+AGENT_PATH_ASSESS_DOCUMENT = "/api/v1/assess-documents"
+# Text Extractor -> Buat lengkapin proposal value
+AGENT_PATH_EXTRACT_DOCUMENT = "/api/v1/extract-from-base64"
+# Overlap Comparator
+AGENT_PATH_OVERLAP_COMPARATOR = "/api/v1/overlap-comparator-vector"
+# Summarizer
+AGENT_PATH_SUMMARIZER = "/api/v1/summarizer"
+# Hasil Generator Recommendation
+AGENT_PATH_RECOMMENDATION_GENERATOR = "/api/v1/recommendation-generator"
 
 
 async def create_proposal(
@@ -47,9 +72,6 @@ async def upload_document_proposal(
     doc_support_length = len(dto.doc_supports) if dto.doc_supports else 0
     total_file = 2 + doc_support_length
     bulk_proposal_document: List[models.ProposalDocument] = []
-    kak_file_name, kak_file_base64 = encoding_base_64(dto.kak_file)
-    rab_file_name, rab_file_base64 = encoding_base_64(dto.rab_file)
-    sp_file_name, sp_file_base64 = encoding_base_64(dto.sp_file)
     proposal_job = models.ProposalJob(
         proposal_id=dto.proposal_id,
         total_file=total_file,
@@ -61,22 +83,19 @@ async def upload_document_proposal(
         [
             models.ProposalDocument(
                 proposal_id=dto.proposal_id,
-                file_name=kak_file_name,
-                encoding_base_64=kak_file_base64,
+                **dto.kak_file.model_dump(),
                 type="kak",
                 runtime_id=proposal_job.id,
             ),
             models.ProposalDocument(
                 proposal_id=dto.proposal_id,
-                file_name=rab_file_name,
-                encoding_base_64=rab_file_base64,
+                **dto.rab_file.model_dump(),
                 type="rab",
                 runtime_id=proposal_job.id,
             ),
             models.ProposalDocument(
                 proposal_id=dto.proposal_id,
-                file_name=sp_file_name,
-                encoding_base_64=sp_file_base64,
+                **dto.sp_file.model_dump(),
                 type="sp",
                 runtime_id=proposal_job.id,
             ),
@@ -84,12 +103,10 @@ async def upload_document_proposal(
     )
     if dto.doc_supports:
         for doc_support in dto.doc_supports:
-            doc_support_name, doc_support_base64 = encoding_base_64(doc_support)
             bulk_proposal_document.append(
                 models.ProposalDocument(
                     proposal_id=dto.proposal_id,
-                    file_name=doc_support_name,
-                    encoding_base_64=doc_support_base64,
+                    **doc_support.model_dump(),
                     type="doc_support",
                     runtime_id=proposal_job.id,
                 )
@@ -106,9 +123,13 @@ async def background_process_job_agent(
     proposal_id: int,
 ):
     print(f"Background Process Job Agent {job_id} {proposal_id}")
-    qProposalDocument = select(models.ProposalDocument).where(
-        models.ProposalDocument.runtime_id == job_id,
-        models.ProposalDocument.proposal_id == proposal_id,
+    qProposalDocument = (
+        select(models.ProposalDocument)
+        .options(undefer(models.ProposalDocument.summary))
+        .where(
+            models.ProposalDocument.runtime_id == job_id,
+            models.ProposalDocument.proposal_id == proposal_id,
+        )
     )
     rProposalDocument = await session.execute(qProposalDocument)
     propDocs = rProposalDocument.scalars().all()
@@ -121,6 +142,8 @@ async def background_process_job_agent(
         .options(
             joinedload(models.Proposal.jenis_belanja),
             joinedload(models.Proposal.sub_jenis_belanja),
+            # The stages read and write the agent outputs.
+            undefer_group("content"),
         )
         .where(models.Proposal.id == proposal_id)
     )
@@ -132,268 +155,84 @@ async def background_process_job_agent(
     await session.commit()
     await session.refresh(propJob)
 
-    is_error_upload = False
-
-    # Generate Summary
-    urlSummary = f"{settings.agent_url}/api/v1/parse-single-base64"
-    # Generate Assess Document | Allignment Assessor
-    urlAssessDocument = f"{settings.agent_url}/api/v1/assess-documents"
-    # Text Extractor -> Buat lengkapin proposal value
-    urlExtractDocument = f"{settings.agent_url}/api/v1/extract-from-base64"
-    # Overlap Comparator
-    urlOverlapComparator = f"{settings.agent_url}/api/v1/overlap-comparator-vector"
-    # Summarizer
-    urlSummarizer = f"{settings.agent_url}/api/v1/summarizer"
-
-    # Hasil Generator Recommendation
-    urlGeneratorRecommendation = f"{settings.agent_url}/api/v1/recommendation-generator"
-
-    headers = {
-        "Content-Type": "application/json",
-        "X-API-Key": settings.agent_api_key,
+    seeds = {
+        "documents": propDocs,
+        "kak_document": next((item for item in propDocs if item.type == "kak"), None),
+        "proposal": proposal,
+        "jenis_belanja": proposal.jenis_belanja.label,
+        "sub_jenis_belanja": proposal.sub_jenis_belanja.label,
     }
 
-    async with httpx.AsyncClient(timeout=240) as client:
-        for doc in propDocs:
-            bodySummary = create_body_proposal_doc_summary(doc)
-            print(f"Extract Summary {doc.file_name}")
-            try:
-                res_summary = await client.post(
-                    urlSummary,
-                    json=bodySummary,
-                    headers=headers,
-                )
-
-                if res_summary.status_code != 200:
-                    print(f"Error Extract Summary {doc.file_name}")
-                    propJob.total_failed_file += 1
-                    continue
-
-                res_summary = res_summary.json()
-                doc.summary = res_summary["data"]
-
-                propJob.total_uploaded_file += 1
-            except Exception as e:
-                print(f"Error Hit API: {e}")
-                propJob.total_failed_file += 1
-
-        is_error_upload = propJob.total_failed_file > 0
+    hooks = ProposalStageCheckpoint(session, propJob, proposal, propDocs)
+    # A retried job only reruns the stages that did not complete last time.
+    checkpoints = await proposal_job_stage.get_completed_stage_outputs(session, job_id)
+    if checkpoints:
+        print(f"Resume Job {job_id} from checkpoints: {', '.join(checkpoints)}")
+    for name, output in checkpoints.items():
+        hooks.apply(name, output)
+
+    result = await run_stage_graph(
+        PROPOSAL_STAGES,
+        seeds,
+        context=ProposalPipelineContext(client=agent_client, job=propJob),
+        hooks=hooks,
+        completed=checkpoints,
+    )
 
-        if await check_or_throw_error(
-            session,
-            propJob,
-            proposal,
-            is_error_upload,
-            "Error Upload Document",
-        ):
-            return
-
-        # Get Proposal Verification
-        body_verification = create_body_proposal_verification(propDocs)
-        print(f"Extract Verification")
-        res_verification = await client.post(
-            urlAssessDocument,
-            json=body_verification,
-            headers=headers,
+    if any(is_agent_unavailable(exc) for exc in result.failed.values()):
+        # Not the proposal's fault: park the job until the circuit breaker
+        # lets requests through again; completed stages stay checkpointed.
+        print(f"Agent unavailable, parking Job {job_id}")
+        await proposal_job.park_proposal_job(
+            session, propJob, settings.agent_circuit_reset_seconds
         )
-        if res_verification.status_code != 200:
-            print(f"Error Extract Verification")
-            propJob.status = "failed"
-            is_error_upload = True
-        else:
-            res_verification_json = res_verification.json()
-            proposal.proposal_verification = clear_markdown(
-                res_verification_json["result"]["data"]
-            )
-
-        if await check_or_throw_error(
-            session,
-            propJob,
-            proposal,
-            is_error_upload,
-            "Error Extract Verification Document",
-        ):
-            return
-
-        kak_base64 = [item for item in propDocs if item.type == "kak"][
-            0
-        ].encoding_base_64
-        kak_summary = [item for item in propDocs if item.type == "kak"][0].summary
-        jenis_belanja = proposal.jenis_belanja.label
-        sub_jenis_belanja = proposal.sub_jenis_belanja.label
-
-        # Get Proposal Map Priority
-        proposalMapPriorities: List[models.ProposalMapPriority] = []
-        for file in ["apr-spbe.md", "renja.md", "renstra.md", "tusi.md"]:
-            label = MAP_PRIORITY_FILE_NAME.get(file) if file else "UNKNOWN"
-            print(f"Extract Map Priority {label}")
-            body_map_priority = create_body_proposal_allignment(
-                file,
-                kak_base64,
-                jenis_belanja,
-                sub_jenis_belanja,
-            )
-            res_map_priority = await client.post(
-                urlAssessDocument,
-                json=body_map_priority,
-                headers=headers,
-            )
-            if res_map_priority.status_code != 200:
-                print(f"Error Extract Map Priority {label}")
-                is_error_upload = True
-                continue
-            else:
-                res_map_priority_json = res_map_priority.json()
-                res_map_priority_data = res_map_priority_json["result"]
-
-                p = models.ProposalMapPriority(
-                    proposal_id=proposal_id,
-                    label=label,
-                    score=res_map_priority_data["skor"],
-                    reason=res_map_priority_data["alasan"],
-                )
-                proposalMapPriorities.append(p)
-
-        if await check_or_throw_error(
-            session,
-            propJob,
-            proposal,
-            is_error_upload,
-            "Error Extract Map Priority",
-        ):
-            return
-
-        # Create Extractor Proposal
-        body_extractor_proposal = create_body_proposal_extractor(kak_base64)
-        res_extractor_proposal = await client.post(
-            urlExtractDocument,
-            json=body_extractor_proposal,
-            headers=headers,
-        )
-        print(f"Extract Extractor Proposal")
-        if res_extractor_proposal.status_code != 200:
-            print(f"Error Extract Extractor Proposal")
-            is_error_upload = True
-        else:
-            res_extractor_proposal_json = res_extractor_proposal.json()
-            output_extactor = res_extractor_proposal_json["data"]
-            proposal_allignment_response = str([output_extactor])
-
-            for output in output_extactor:
-                if output["key"] == "Rincian Output":
-                    proposal.rincian_output = output["value"]
-                elif output["key"] == "Direktorat":
-                    proposal.satuan_kerja = output["value"]
-                elif output["key"] == "Total Biaya":
-                    proposal.anggaran = string_to_float(output["value"])
-
-        if await check_or_throw_error(
-            session,
-            propJob,
-            proposal,
-            is_error_upload,
-            "Error Extract Extractor Proposal",
-        ):
-            return
-
-        # Create Proposal Score Overlap
-        proposalScoreOverlaps: List[models.ProposalScoreOverlap] = []
-        body_score_overlap = create_body_overlap_vector(kak_summary, kak_base64)
-        print(f"Extract Score Overlap")
-        res_score_overlap = await client.post(
-            urlOverlapComparator,
-            json=body_score_overlap,
-            headers=headers,
+        await session.close()
+        return
+
+    if result.is_error:
+        for name, exc in result.failed.items():
+            print(f"Stage {name} failed: {exc}")
+        if result.skipped:
+            print(f"Stages skipped: {', '.join(result.skipped)}")
+        failed_stage = next(
+            (stage for stage in PROPOSAL_STAGES if stage.name in result.failed),
+            None,
         )
-        if res_score_overlap.status_code != 200:
-            print(f"Error Extract Score Overlap")
-            is_error_upload = True
-        else:
-            res_score_overlap_json = res_score_overlap.json()
-            res_score_overlap_data = res_score_overlap_json["result"]
-            for each in res_score_overlap_data:
-                p = models.ProposalScoreOverlap(
-                    proposal_id=proposal_id,
-                    work_unit=each["direktorat"],
-                    score=each["skor"],
-                    total_budget=string_to_float(each["total_biaya"]),
-                    reason=each["alasan"],
-                    rincian_output=each["rincian_output"],
-                    encoding_base_64=each["db_base64_rab"],
-                )
-                proposalScoreOverlaps.append(p)
-
-        if await check_or_throw_error(
+        await check_or_throw_error(
             session,
             propJob,
             proposal,
-            is_error_upload,
-            "Error Extract Score Overlap",
-        ):
-            return
-
-        # Create Proposal Summary
-        for each in res_score_overlap_data:
-            if each.get("db_base64_rab"):
-                each.pop("db_base64_rab", None)
-        body_proposal_summary = create_body_proposal_summary(
-            proposal_verification_response=proposal.proposal_verification,
-            proposal_allignment_response=proposal_allignment_response,
-            overlap_vector_response=str(res_score_overlap_data),
+            True,
+            failed_stage.error_message if failed_stage else None,
         )
-        print(f"Extract Proposal Summary")
-        res_proposal_summary = await client.post(
-            urlSummarizer,
-            json=body_proposal_summary,
-            headers=headers,
+        return
+
+    proposalMapPriorities = [
+        models.ProposalMapPriority(proposal_id=proposal_id, **each)
+        for each in result.outputs["map_priority"]
+    ]
+    # A no-op for rows stage_overlap stored; converts checkpoints saved while
+    # the base64 was still part of the output.
+    overlaps = [
+        await store_overlap_attachment(each) for each in result.outputs["overlap"]
+    ]
+    proposalScoreOverlaps = [
+        models.ProposalScoreOverlap(
+            proposal_id=proposal_id,
+            work_unit=each["direktorat"],
+            score=each["skor"],
+            total_budget=string_to_float(each["total_biaya"]),
+            reason=each["alasan"],
+            rincian_output=each["rincian_output"],
+            **{field: each.get(field) for field in ATTACHMENT_FIELDS},
         )
-        if res_proposal_summary.status_code != 200:
-            print(f"Error Extract Proposal Summary")
-            is_error_upload = True
-        else:
-            res_proposal_summary_json = res_proposal_summary.json()
-            proposal.summary = clear_markdown(res_proposal_summary_json["data"])
-
-        if await check_or_throw_error(
-            session,
-            propJob,
-            proposal,
-            is_error_upload,
-            "Error Extract Proposal Summary",
-        ):
-            return
-
-        # Create Proposal Evaluation Letter
-        body_evaluation_letter = create_body_proposal_evaluation_letter(proposal)
-        print(f"Extract Proposal Evaluation Letter")
-        res_evaluation_letter = await client.post(
-            urlGeneratorRecommendation,
-            json=body_evaluation_letter,
-            headers=headers,
-        )
-        if res_evaluation_letter.status_code != 200:
-            print(f"Error Extract Proposal Evaluation Letter")
-            is_error_upload = True
-        else:
-            res_evaluation_letter_json = res_evaluation_letter.json()
-            evaluation_letter = res_evaluation_letter_json["data"]
-            value = base64.b64encode(evaluation_letter.encode("utf-8")).decode("utf-8")
-            proposal.evaluasi_letter = clear_markdown(
-                value
-            )
-
-        if await check_or_throw_error(
-            session,
-            propJob,
-            proposal,
-            is_error_upload,
-            "Error Extract Proposal Evaluation Letter",
-        ):
-            return
+        for each in overlaps
+    ]
 
     propJob.status = "completed"
     propJob.completed_at = datetime.datetime.now()
     proposal.status = "approved"
+    await bump_artifact_version(session, proposal.id)
 
     print(f"Proposal Job {propJob.status}")
 
@@ -402,16 +241,395 @@ async def background_process_job_agent(
     session.add_all(propDocs)
     session.add(proposal)
     session.add(propJob)
+    await proposal_job_stage.clear_stage_outputs(session, job_id)
 
     await session.commit()
     await session.close()
 
 
+# ===============================
+# Pipeline Stages
+# ===============================
+@dataclass
+class ProposalPipelineContext:
+    client: AgentClient
+    job: models.ProposalJob
+
+
+async def stage_document_summary(
+    ctx: ProposalPipelineContext,
+    documents: List[models.ProposalDocument],
+) -> dict:
+    semaphore = asyncio.Semaphore(settings.agent_summary_concurrency)
+
+    unavailable: List[AgentUnavailableError] = []
+
+    async def extract_summary(doc: models.ProposalDocument) -> Optional[str]:
+        # Already summarized by an earlier attempt of this job.
+        if doc.summary:
+            return doc.summary
+        async with semaphore:
+            print(f"Extract Summary {doc.file_name}")
+            try:
+                return await post_agent(
+                    ctx.client,
+                    AGENT_PATH_SUMMARY,
+                    create_body_proposal_doc_summary(doc),
+                    parse=lambda res: agent_text(res["data"]),
+                )
+            except AgentUnavailableError as e:
+                unavailable.append(e)
+                return None
+            except Exception as e:
+                print(f"Error Extract Summary {doc.file_name}: {e}")
+                return None
+
+    # Summaries are independent per document, so they run side by side
+    # (bounded by the semaphore).
+    results = await asyncio.gather(*[extract_summary(doc) for doc in documents])
+    summaries = {
+        str(doc.id): summary
+        for doc, summary in zip(documents, results)
+        if summary is not None
+    }
+    if len(summaries) < len(documents):
+        raise PartialStageFailure(
+            f"{len(documents) - len(summaries)} document(s) not summarized",
+            summaries,
+        ) from (unavailable[0] if unavailable else None)
+    return summaries
+
+
+async def stage_verification(
+    ctx: ProposalPipelineContext,
+    documents: List[models.ProposalDocument],
+) -> str:
+    print("Extract Verification")
+    verification = await post_agent(
+        ctx.client,
+        AGENT_PATH_ASSESS_DOCUMENT,
+        create_body_proposal_verification(documents),
+        parse=lambda res: agent_text(res["result"]["data"]),
+    )
+    return clear_markdown(verification)
+
+
+async def stage_map_priority(
+    ctx: ProposalPipelineContext,
+    kak_document: models.ProposalDocument,
+    jenis_belanja: str,
+    sub_jenis_belanja: str,
+) -> List[dict]:
+    async def assess(file: str, label: str) -> dict:
+        print(f"Extract Map Priority {label}")
+        body_map_priority = create_body_proposal_allignment(
+            file,
+            document_base64(kak_document),
+            jenis_belanja,
+            sub_jenis_belanja,
+        )
+        try:
+            return await post_agent(
+                ctx.client,
+                AGENT_PATH_ASSESS_DOCUMENT,
+                body_map_priority,
+                parse=lambda res: {
+                    "label": label,
+                    "score": res["result"]["skor"],
+                    "reason": res["result"]["alasan"],
+                },
+            )
+        except Exception as e:
+            print(f"Error Extract Map Priority {label}: {e}")
+            raise
+
+    # One assessment per reference document, all against the same KAK, so
+    # they are issued together and the stage costs a single round-trip.
+    references = settings.map_priority_documents
+    results = await asyncio.gather(
+        *[assess(file, label) for file, label in references.items()],
+        return_exceptions=True,
+    )
+    errors = {
+        label: result
+        for label, result in zip(references.values(), results)
+        if isinstance(result, BaseException)
+    }
+    if errors:
+        raise AgentRequestError(
+            f"Map priority failed for {', '.join(errors)}"
+        ) from next(iter(errors.values()))
+    return list(results)
+
+
+async def stage_extractor(
+    ctx: ProposalPipelineContext,
+    kak_document: models.ProposalDocument,
+) -> List[dict]:
+    print("Extract Extractor Proposal")
+    return await post_agent(
+        ctx.client,
+        AGENT_PATH_EXTRACT_DOCUMENT,
+        create_body_proposal_extractor(document_base64(kak_document)),
+        parse=parse_extractor_result,
+    )
+
+
+async def stage_overlap(
+    ctx: ProposalPipelineContext,
+    kak_document: models.ProposalDocument,
+    summary: dict,
+) -> List[dict]:
+    print("Extract Score Overlap")
+    overlaps = await post_agent(
+        ctx.client,
+        AGENT_PATH_OVERLAP_COMPARATOR,
+        create_body_overlap_vector(
+            summary[str(kak_document.id)],
+            document_base64(kak_document),
+        ),
+        parse=parse_overlap_result,
+    )
+    # Stored in the blob store here, so the checkpoint holds the hash of each
+    # RAB attachment instead of megabytes of base64.
+    return [await store_overlap_attachment(each) for each in overlaps]
+
+
+async def stage_summarizer(
+    ctx: ProposalPipelineContext,
+    verification: str,
+    extractor: List[dict],
+    overlap: List[dict],
+) -> str:
+    # The RAB attachments are only needed for the overlap rows, not the prompt.
+    overlap_summary = [
+        {
+            key: value
+            for key, value in each.items()
+            if key not in ATTACHMENT_FIELDS and key != "db_base64_rab"
+        }
+        for each in overlap
+    ]
+    print("Extract Proposal Summary")
+    proposal_summary = await post_agent(
+        ctx.client,
+        AGENT_PATH_SUMMARIZER,
+        create_body_proposal_summary(
+            proposal_verification_response=verification,
+            proposal_allignment_response=str([extractor]),
+            overlap_vector_response=str(overlap_summary),
+        ),
+        parse=lambda res: agent_text(res["data"]),
+    )
+    return clear_markdown(proposal_summary)
+
+
+async def stage_recommendation(
+    ctx: ProposalPipelineContext,
+    proposal: models.Proposal,
+    extractor: List[dict],
+    summarizer: str,
+) -> str:
+    # extractor and summarizer are already applied to `proposal` by the time
+    # this stage starts; they are declared so the graph orders them first.
+    print("Extract Proposal Evaluation Letter")
+    evaluation_letter = await post_agent(
+        ctx.client,
+        AGENT_PATH_RECOMMENDATION_GENERATOR,
+        create_body_proposal_evaluation_letter(proposal),
+        parse=lambda res: agent_text(res["data"]),
+    )
+    value = base64.b64encode(evaluation_letter.encode("utf-8")).decode("utf-8")
+    return clear_markdown(value)
+
+
+PROPOSAL_STAGES: List[Stage] = [
+    Stage(
+        name="summary",
+        run=stage_document_summary,
+        inputs=("documents",),
+        error_message="Error Upload Document",
+    ),
+    Stage(
+        name="verification",
+        run=stage_verification,
+        inputs=("documents",),
+        error_message="Error Extract Verification Document",
+    ),
+    Stage(
+        name="map_priority",
+        run=stage_map_priority,
+        inputs=("kak_document", "jenis_belanja", "sub_jenis_belanja"),
+        error_message="Error Extract Map Priority",
+    ),
+    Stage(
+        name="extractor",
+        run=stage_extractor,
+        inputs=("kak_document",),
+        error_message="Error Extract Extractor Proposal",
+    ),
+    Stage(
+        name="overlap",
+        run=stage_overlap,
+        inputs=("kak_document", "summary"),
+        error_message="Error Extract Score Overlap",
+    ),
+    Stage(
+        name="summarizer",
+        run=stage_summarizer,
+        inputs=("verification", "extractor", "overlap"),
+        error_message="Error Extract Proposal Summary",
+    ),
+    Stage(
+        name="recommendation",
+        run=stage_recommendation,
+        inputs=("proposal", "extractor", "summarizer"),
+        error_message="Error Extract Proposal Evaluation Letter",
+    ),
+]
+
+
+class ProposalStageCheckpoint(StageHooks):
+    """Applies stage outputs to the proposal and checkpoints them against the
+    job, so a retry can resume from the stage that failed."""
+
+    def __init__(
+        self,
+        session: AsyncSession,
+        job: models.ProposalJob,
+        proposal: models.Proposal,
+        documents: List[models.ProposalDocument],
+    ):
+        self.session = session
+        self.job = job
+        self.proposal = proposal
+        self.documents = documents
+        self._started = {}
+
+    def apply(self, stage_name: str, output: Any):
+        if stage_name == "summary":
+            for doc in self.documents:
+                if str(doc.id) in output:
+                    doc.summary = output[str(doc.id)]
+            self.job.total_uploaded_file = len(output)
+            self.job.total_failed_file = len(self.documents) - len(output)
+        elif stage_name == "verification":
+            self.proposal.proposal_verification = output
+        elif stage_name == "extractor":
+            for item in output:
+                if item["key"] == "Rincian Output":
+                    self.proposal.rincian_output = item["value"]
+                elif item["key"] == "Direktorat":
+                    self.proposal.satuan_kerja = item["value"]
+                elif item["key"] == "Total Biaya":
+                    self.proposal.anggaran = string_to_float(item["value"])
+        elif stage_name == "summarizer":
+            self.proposal.summary = output
+        elif stage_name == "recommendation":
+            self.proposal.evaluasi_letter = output
+
+    def observe(self, stage: Stage, status: str):
+        PIPELINE_STAGES.labels(stage.name, status).inc()
+        started = self._started.pop(stage.name, None)
+        if started is not None:
+            PIPELINE_STAGE_DURATION.labels(stage.name, status).observe(
+                time.perf_counter() - started
+            )
+
+    async def started(self, stage: Stage):
+        self._started[stage.name] = time.perf_counter()
+        await proposal_job_stage.save_stage_checkpoint(
+            self.session, self.job.id, stage.name, "running"
+        )
+
+    async def done(self, stage: Stage, output: Any):
+        print(f"Stage {stage.name} done")
+        self.observe(stage, "completed")
+        self.apply(stage.name, output)
+        await proposal_job_stage.save_stage_checkpoint(
+            self.session, self.job.id, stage.name, "completed", output=output
+        )
+
+    async def failed(self, stage: Stage, exc: BaseException):
+        self.observe(stage, "failed")
+        if isinstance(exc, PartialStageFailure):
+            self.apply(stage.name, exc.output)
+        await proposal_job_stage.save_stage_checkpoint(
+            self.session,
+            self.job.id,
+            stage.name,
+            "failed",
+            error_message=str(exc),
+        )
+
+    async def skipped(self, stage: Stage):
+        self.observe(stage, "skipped")
+        await proposal_job_stage.save_stage_checkpoint(
+            self.session, self.job.id, stage.name, "skipped"
+        )
+
+
 # ===============================
 # Helper Function
 # ===============================
-def encoding_base_64(file: UploadFile) -> Tuple[str, str]:
-    return file.filename, base64.b64encode(file.file.read()).decode("utf-8")
+# ===============================
+# Agent Response Parsers
+# ===============================
+# Passed to post_agent: they raise on a response the stages cannot use, so
+# it is not cached.
+OVERLAP_FIELDS = ("direktorat", "skor", "total_biaya", "alasan", "rincian_output")
+
+
+def agent_text(value: Any) -> str:
+    if not isinstance(value, str):
+        raise TypeError(f"Expected text, got {type(value).__name__}")
+    return value
+
+
+def parse_extractor_result(res: dict) -> List[dict]:
+    items = res["data"]
+    if not isinstance(items, list):
+        raise TypeError(f"Expected a list, got {type(items).__name__}")
+    if not all("key" in item and "value" in item for item in items):
+        raise KeyError("Extractor item without key/value")
+    return items
+
+
+def parse_overlap_result(res: dict) -> List[dict]:
+    overlaps = res["result"]
+    if not isinstance(overlaps, list):
+        raise TypeError(f"Expected a list, got {type(overlaps).__name__}")
+    for each in overlaps:
+        missing = [field for field in OVERLAP_FIELDS if field not in each]
+        if missing:
+            raise KeyError(f"Overlap row without {', '.join(missing)}")
+    return overlaps
+
+
+ATTACHMENT_FIELDS = ("content_sha256", "content_size", "content_type")
+
+
+async def store_attachment(base64_data: Optional[str]) -> dict:
+    if not base64_data:
+        return {}
+    blob = await put_bytes(blob_store, base64.b64decode(base64_data))
+    return {
+        "content_sha256": blob.sha256,
+        "content_size": blob.size,
+        "content_type": "application/pdf",
+    }
+
+
+async def store_overlap_attachment(each: dict) -> dict:
+    """An overlap row with its `db_base64_rab` moved to the blob store and
+    replaced by the blob's ATTACHMENT_FIELDS."""
+    row = {key: value for key, value in each.items() if key != "db_base64_rab"}
+    row.update(await store_attachment(each.get("db_base64_rab")))
+    return row
+
+
+def document_base64(doc: models.ProposalDocument) -> Base64Source:
+    return BlobBase64Source(blob_store, doc.content_sha256, doc.content_size)
 
 
 def get_llm_config(temperature: float = 0.7) -> dict:
@@ -424,7 +642,7 @@ def get_llm_config(temperature: float = 0.7) -> dict:
 
 def create_body_proposal_doc_summary(doc: models.ProposalDocument) -> dict:
     return {
-        "base64_data": doc.encoding_base_64,
+        "base64_data": document_base64(doc),
         "filename": doc.file_name,
         "raw_input": "",
         "category": str(doc.type).upper() if doc.type != "doc_support" else "",
@@ -435,7 +653,7 @@ def create_body_proposal_doc_summary(doc: models.ProposalDocument) -> dict:
 def create_body_proposal_verification(docs: List[models.ProposalDocument]) -> dict:
     return {
         "reference_document_name": "sop-clearance.md",
-        "base64_data": [doc.encoding_base_64 for doc in docs],
+        "base64_data": [document_base64(doc) for doc in docs],
         "filenames": [
             str(doc.type).upper() if doc.type != "doc_support" else "" for doc in docs
         ],
@@ -446,7 +664,7 @@ def create_body_proposal_verification(docs: List[models.ProposalDocument]) -> di
 # Pemetaan Prioritas
 def create_body_proposal_allignment(
     reference_doc: str,
-    kak_base64: str,
+    kak_base64: Base64Source,
     jenis_belanja: str,
     kode_belanja: str,
 ) -> dict:
@@ -459,7 +677,7 @@ def create_body_proposal_allignment(
     }
 
 
-def create_body_proposal_extractor(kak_base64: str) -> dict:
+def create_body_proposal_extractor(kak_base64: Base64Source) -> dict:
     return {
         "base64_data": kak_base64,
         "filename": "KAK",
@@ -468,7 +686,7 @@ def create_body_proposal_extractor(kak_base64: str) -> dict:
     }
 
 
-def create_body_overlap_vector(summary_kak: str, base_64_kak: str) -> dict:
+def create_body_overlap_vector(summary_kak: str, base_64_kak: Base64Source) -> dict:
     return {
         "raw_input": summary_kak,
         "base64_data": base_64_kak,
@@ -517,6 +735,9 @@ async def check_or_throw_error(
         proposal.status = "failed"
         session.add(propJob)
         session.add(proposal)
+        # The failed stages may have checkpointed new outputs over the
+        # previous run's; they must not be served under its ETag.
+        await bump_artifact_version(session, proposal.id)
         await session.commit()
         await session.close()
         return True
@@ -567,8 +788,25 @@ async def get_proposal_job_stream(
         await asyncio.sleep(1)
 
 
-async def get_list_proposal(session: AsyncSession) -> List[models.Proposal]:
-    qProposal = (
+def active_job_id():
+    """The proposal's current job: `runtime_id` once the upload recorded it,
+    else its latest job (ix_proposal_job_proposal_created). A scalar
+    lookup, so a proposal stays one row however many jobs it has had."""
+    qLatestJob = (
+        select(models.ProposalJob.id)
+        .where(models.ProposalJob.proposal_id == models.Proposal.id)
+        .order_by(models.ProposalJob.created_at.desc(), models.ProposalJob.id.desc())
+        .limit(1)
+        .correlate(models.Proposal)
+        .scalar_subquery()
+    )
+    return func.coalesce(models.Proposal.runtime_id, qLatestJob)
+
+
+def select_proposal_rows(*columns):
+    """The proposal list row (ProposalListReadSchema) with its labels,
+    plus `columns`."""
+    return (
         select(
             models.Proposal.id,
             models.Proposal.user_id,
@@ -583,7 +821,8 @@ async def get_list_proposal(session: AsyncSession) -> List[models.Proposal]:
             models.Proposal.status,
             models.Proposal.rincian_output,
             models.Proposal.created_at,
-            models.ProposalJob.id.label("runtime_id"),
+            active_job_id().label("runtime_id"),
+            *columns,
         )
         .join(
             models.JenisBelanja,
@@ -598,16 +837,110 @@ async def get_list_proposal(session: AsyncSession) -> List[models.Proposal]:
             models.Kro.id == models.Proposal.kro_id,
             isouter=True,
         )
-        .join(
-            models.ProposalJob,
-            models.ProposalJob.proposal_id == models.Proposal.id,
-            isouter=True,
+    )
+
+
+def encode_list_cursor(created_at: datetime.datetime, id: int) -> str:
+    raw = json.dumps([created_at.isoformat(), id]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_list_cursor(cursor: str) -> Tuple[datetime.datetime, int]:
+    """(created_at, id) of the last row of the previous page; ValueError
+    for anything that is not a cursor we handed out."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.datetime.fromisoformat(created_at), int(id)
+    except Exception as exc:
+        raise ValueError(f"Invalid cursor {cursor!r}") from exc
+
+
+async def get_list_proposal(
+    session: AsyncSession,
+    limit: int,
+    cursor: Optional[str] = None,
+    status: Optional[str] = None,
+    jenis_belanja_id: Optional[int] = None,
+    kro_id: Optional[int] = None,
+    satuan_kerja: Optional[str] = None,
+    created_from: Optional[datetime.date] = None,
+    created_to: Optional[datetime.date] = None,
+) -> Tuple[List[models.Proposal], Optional[str]]:
+    """One page of the user's proposals, newest first, and the cursor of
+    the next page (None on the last one).
+
+    Pages are keyset paginated on (created_at, id): a page starts right
+    after the cursor's row instead of at an OFFSET, so every page costs the
+    same index range scan however deep it is (see the ix_proposal_user_*
+    indexes on the model).
+    """
+    qProposal = select_proposal_rows().where(models.Proposal.user_id == USER_ID)
+    if cursor:
+        cursor_created_at, cursor_id = decode_list_cursor(cursor)
+        qProposal = qProposal.where(
+            tuple_(models.Proposal.created_at, models.Proposal.id)
+            < tuple_(cursor_created_at, cursor_id)
         )
-        .where(models.Proposal.user_id == USER_ID)
-        .order_by(models.Proposal.created_at.desc())
+    if status:
+        qProposal = qProposal.where(models.Proposal.status == status)
+    if jenis_belanja_id:
+        qProposal = qProposal.where(
+            models.Proposal.jenis_belanja_id == jenis_belanja_id
+        )
+    if kro_id:
+        qProposal = qProposal.where(models.Proposal.kro_id == kro_id)
+    if satuan_kerja:
+        qProposal = qProposal.where(models.Proposal.satuan_kerja == satuan_kerja)
+    if created_from:
+        qProposal = qProposal.where(models.Proposal.created_at >= created_from)
+    if created_to:
+        qProposal = qProposal.where(
+            models.Proposal.created_at < created_to + datetime.timedelta(days=1)
+        )
+    qProposal = qProposal.order_by(
+        models.Proposal.created_at.desc(),
+        models.Proposal.id.desc(),
+    ).limit(limit + 1)
+
+    rProposal = await session.execute(qProposal)
+    proposals = rProposal.mappings().all()
+    next_cursor = None
+    if len(proposals) > limit:
+        proposals = proposals[:limit]
+        last = proposals[-1]
+        next_cursor = encode_list_cursor(last["created_at"], last["id"])
+    return proposals, next_cursor
+
+
+async def bump_artifact_version(session: AsyncSession, proposal_id: int) -> int:
+    """Increment artifact_version in the database, not on a possibly stale
+    ORM row, so concurrent bumps (a note edit while a job completes) never
+    produce the same version. Committed with the caller's transaction."""
+    rProposal = await session.execute(
+        update(models.Proposal)
+        .where(models.Proposal.id == proposal_id)
+        .values(artifact_version=func.coalesce(models.Proposal.artifact_version, 0) + 1)
+        .returning(models.Proposal.artifact_version)
+    )
+    return rProposal.scalar_one()
+
+
+async def get_proposal_artifact_state(session: AsyncSession, proposal_id: int):
+    """runtime_id, job_status and artifact_version of a proposal (None when
+    it does not exist); cheap enough to answer conditional requests."""
+    runtime_id = active_job_id()
+    qProposal = (
+        select(
+            runtime_id.label("runtime_id"),
+            models.ProposalJob.status.label("job_status"),
+            models.Proposal.artifact_version,
+        )
+        .join(models.ProposalJob, models.ProposalJob.id == runtime_id, isouter=True)
+        .where(models.Proposal.id == proposal_id)
     )
     rProposal = await session.execute(qProposal)
-    return rProposal.mappings().all()
+    return rProposal.mappings().first()
 
 
 async def get_proposal_by_id(
@@ -619,12 +952,41 @@ async def get_proposal_by_id(
     return rProposal.scalars().first()
 
 
+async def get_proposal_columns(
+    session: AsyncSession,
+    proposal_id: int,
+    *columns,
+):
+    """Only the given columns of a proposal, None when it does not exist.
+    The large Text columns are deferred on the model, so the detail
+    endpoints read them here one at a time."""
+    qProposal = select(*columns).where(models.Proposal.id == proposal_id)
+    rProposal = await session.execute(qProposal)
+    return rProposal.mappings().first()
+
+
+async def get_proposal_verification(
+    session: AsyncSession,
+    proposal_id: int,
+) -> Optional[str]:
+    result = await get_proposal_columns(
+        session, proposal_id, models.Proposal.proposal_verification
+    )
+    return result["proposal_verification"] if result else None
+
+
+async def get_proposal_summary(session: AsyncSession, proposal_id: int):
+    return await get_proposal_columns(
+        session, proposal_id, models.Proposal.summary, models.Proposal.note
+    )
+
+
 async def get_proposal_document(
     session: AsyncSession,
     proposal_id: int,
     type: str,
-) -> models.ProposalDocument:
-    qProposalDocument = select(models.ProposalDocument).where(
+) -> Optional[str]:
+    qProposalDocument = select(models.ProposalDocument.summary).where(
         models.ProposalDocument.proposal_id == proposal_id,
         models.ProposalDocument.type == type,
     )
@@ -670,6 +1032,8 @@ async def update_proposal(
     if input.runtime_id:
         a.runtime_id = input.runtime_id
     session.add(a)
+    if input.note or input.status:
+        await bump_artifact_version(session, id)
     await session.commit()
     await session.refresh(a)
     return a
@@ -677,53 +1041,154 @@ async def update_proposal(
 
 async def get_proposal_detail_by_id(session: AsyncSession, id: int) -> models.Proposal:
     qProposal = (
-        select(
-            models.Proposal.id,
-            models.Proposal.user_id,
-            models.Proposal.jenis_belanja_id,
-            models.JenisBelanja.label.label("jenis_belanja"),
-            models.Proposal.sub_jenis_belanja_id,
-            models.SubJenisBelanja.label.label("sub_jenis_belanja"),
-            models.Proposal.kro_id,
-            models.Kro.description.label("kro_label"),
-            models.Proposal.satuan_kerja,
-            models.Proposal.anggaran,
-            models.Proposal.status,
-            models.Proposal.rincian_output,
-            models.Proposal.created_at,
-            models.ProposalJob.id.label("runtime_id"),
-        )
-        .join(
-            models.JenisBelanja,
-            models.JenisBelanja.id == models.Proposal.jenis_belanja_id,
-        )
-        .join(
-            models.SubJenisBelanja,
-            models.SubJenisBelanja.id == models.Proposal.sub_jenis_belanja_id,
-        )
-        .join(
-            models.Kro,
-            models.Kro.id == models.Proposal.kro_id,
-            isouter=True,
-        )
-        .join(
-            models.ProposalJob,
-            models.ProposalJob.proposal_id == models.Proposal.id,
-            isouter=True,
-        )
+        select_proposal_rows()
         .where(models.Proposal.id == id)
         .order_by(models.Proposal.created_at.desc())
     )
     rProposal = await session.execute(qProposal)
     return rProposal.mappings().first()
 
-async def get_proposal_evaluation_letter_by_id(session: AsyncSession, id: int) -> Optional[str]:
-    raw_query = text("""
-        select
-            evaluasi_letter
-        from proposal
-        where id = :id
-    """)
-    rProposal = await session.execute(raw_query, {"id": id})
-    result = rProposal.mappings().first()
-    return result["evaluasi_letter"] if result["evaluasi_letter"] else None
\ No newline at end of file
+
+PROPOSAL_FULL_FIELDS = (
+    "detail",
+    "verification",
+    "summary",
+    "map_priority",
+    "score_overlap",
+    "evaluation_letter",
+    "documents",
+)
+
+# Summaries served by /document?type= (doc_support has none of its own).
+PROPOSAL_DOCUMENT_TYPES = ("kak", "rab", "sp")
+
+
+def proposal_full_columns(fields: List[str]) -> list:
+    columns = []
+    if "verification" in fields:
+        columns.append(models.Proposal.proposal_verification)
+    if "summary" in fields:
+        columns += [models.Proposal.summary, models.Proposal.note]
+    if "evaluation_letter" in fields:
+        columns.append(models.Proposal.evaluasi_letter)
+    if "map_priority" in fields:
+        qMapPriority = select(
+            func.json_agg(
+                aggregate_order_by(
+                    func.json_build_object(
+                        "id",
+                        models.ProposalMapPriority.id,
+                        "label",
+                        models.ProposalMapPriority.label,
+                        "score",
+                        models.ProposalMapPriority.score,
+                        "reason",
+                        models.ProposalMapPriority.reason,
+                    ),
+                    models.ProposalMapPriority.id,
+                ),
+                type_=JSON,
+            )
+        ).where(models.ProposalMapPriority.proposal_id == models.Proposal.id)
+        columns.append(qMapPriority.scalar_subquery().label("map_priority"))
+    if "score_overlap" in fields:
+        qScoreOverlap = select(
+            func.json_agg(
+                aggregate_order_by(
+                    func.json_build_object(
+                        "id",
+                        models.ProposalScoreOverlap.id,
+                        "work_unit",
+                        models.ProposalScoreOverlap.work_unit,
+                        "total_budget",
+                        models.ProposalScoreOverlap.total_budget,
+                        "score",
+                        models.ProposalScoreOverlap.score,
+                        "reason",
+                        models.ProposalScoreOverlap.reason,
+                        "rincian_output",
+                        models.ProposalScoreOverlap.rincian_output,
+                    ),
+                    models.ProposalScoreOverlap.id,
+                ),
+                type_=JSON,
+            )
+        ).where(models.ProposalScoreOverlap.proposal_id == models.Proposal.id)
+        columns.append(qScoreOverlap.scalar_subquery().label("score_overlap"))
+    if "documents" in fields:
+        qDocuments = select(
+            func.json_agg(
+                aggregate_order_by(
+                    func.json_build_object(
+                        "type",
+                        models.ProposalDocument.type,
+                        "summary",
+                        models.ProposalDocument.summary,
+                    ),
+                    models.ProposalDocument.id,
+                ),
+                type_=JSON,
+            )
+        ).where(
+            models.ProposalDocument.proposal_id == models.Proposal.id,
+            models.ProposalDocument.runtime_id == active_job_id(),
+            models.ProposalDocument.type.in_(PROPOSAL_DOCUMENT_TYPES),
+        )
+        columns.append(qDocuments.scalar_subquery().label("documents"))
+    return columns
+
+
+async def get_proposal_full(
+    session: AsyncSession,
+    id: int,
+    fields: List[str],
+) -> Optional[dict]:
+    """The sections of the proposal detail page in one query.
+
+    Every section is the `data` of its own endpoint (`/{id}`,
+    `/verification`, `/summary`, `/map-priority`, `/score-overlap`,
+    `/evaluation-letter`); `documents` holds the kak, rab and sp summaries
+    of the active job. The lists are aggregated to JSON by Postgres. Only
+    the requested `fields` are selected. None when the proposal does not
+    exist.
+    """
+    qProposal = select_proposal_rows(*proposal_full_columns(fields)).where(
+        models.Proposal.id == id
+    )
+    rProposal = await session.execute(qProposal)
+    row = rProposal.mappings().first()
+    if row is None:
+        return None
+
+    result = {}
+    if "detail" in fields:
+        result["detail"] = schemas.ProposalListReadSchema.model_validate(dict(row))
+    if "verification" in fields:
+        result["verification"] = row["proposal_verification"]
+    if "summary" in fields:
+        result["summary"] = {"summary": row["summary"], "note": row["note"]}
+    if "map_priority" in fields:
+        result["map_priority"] = row["map_priority"] or []
+    if "score_overlap" in fields:
+        overlaps = row["score_overlap"] or []
+        for overlap in overlaps:
+            if overlap["total_budget"] is not None:
+                overlap["total_budget"] = format_rupiah(overlap["total_budget"])
+        result["score_overlap"] = overlaps
+    if "evaluation_letter" in fields:
+        result["evaluation_letter"] = row["evaluasi_letter"] or None
+    if "documents" in fields:
+        # Documents of the active job, ordered by id: the latest of each
+        # type wins.
+        documents = {type: None for type in PROPOSAL_DOCUMENT_TYPES}
+        for doc in row["documents"] or []:
+            documents[doc["type"]] = doc["summary"]
+        result["documents"] = documents
+    return result
+
+
+async def get_proposal_evaluation_letter_by_id(
+    session: AsyncSession, id: int
+) -> Optional[str]:
+    result = await get_proposal_columns(session, id, models.Proposal.evaluasi_letter)
+    return result["evaluasi_letter"] if result and result["evaluasi_letter"] else None
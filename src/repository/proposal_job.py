@@ -1,5 +1,6 @@
+import datetime
 from typing import Optional
-from sqlalchemy import select
+from sqlalchemy import and_, func, or_, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app import models
@@ -18,16 +19,160 @@ async def update_status_retry_proposal_job(
     session: AsyncSession,
     id: int,
     status: str,
+) -> bool:
+    """Put a finished job back on the queue. Only a completed job (succeeded
+    or failed) can be retried: requeueing a queued or running job would let a
+    second worker claim it while the first one still holds the lease.
+    Returns False when the job is not in a retryable state."""
+    result = await session.execute(
+        update(models.ProposalJob)
+        .where(
+            models.ProposalJob.id == id,
+            models.ProposalJob.status == "completed",
+        )
+        .values(
+            status=status,
+            locked_at=None,
+            locked_by=None,
+            attempts=0,
+            scheduled_at=None,
+            total_failed_file=0,
+            total_uploaded_file=0,
+            is_error=False,
+            error_message=None,
+        )
+    )
+    await session.commit()
+    return result.rowcount > 0
+
+
+# ===============================
+# Job Queue
+# ===============================
+async def claim_next_proposal_job(
+    session: AsyncSession,
+    worker_id: str,
+    lease_seconds: int,
 ) -> Optional[models.ProposalJob]:
+    """Lock the oldest runnable job for `worker_id`.
+
+    Runnable means queued, or running under a lease nobody renewed in
+    `lease_seconds` (its worker died). SKIP LOCKED lets any number of workers
+    poll the table without blocking on each other.
+    """
+    now = datetime.datetime.now()
+    qProposalJob = (
+        select(models.ProposalJob)
+        .where(
+            or_(
+                models.ProposalJob.scheduled_at.is_(None),
+                models.ProposalJob.scheduled_at <= now,
+            ),
+            or_(
+                models.ProposalJob.status == "queue",
+                and_(
+                    models.ProposalJob.status == "running",
+                    models.ProposalJob.locked_at
+                    < now - datetime.timedelta(seconds=lease_seconds),
+                ),
+            ),
+        )
+        .order_by(models.ProposalJob.created_at)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+    )
+    rProposalJob = await session.execute(qProposalJob)
+    pj = rProposalJob.scalars().first()
+    if not pj:
+        await session.rollback()
+        return None
+
+    pj.status = "running"
+    pj.locked_at = now
+    pj.locked_by = worker_id
+    pj.attempts += 1
+    session.add(pj)
+    await session.commit()
+    await session.refresh(pj)
+    return pj
+
+
+async def renew_proposal_job_lease(
+    session: AsyncSession,
+    id: int,
+    worker_id: str,
+) -> bool:
+    result = await session.execute(
+        update(models.ProposalJob)
+        .where(
+            models.ProposalJob.id == id,
+            models.ProposalJob.locked_by == worker_id,
+        )
+        .values(locked_at=datetime.datetime.now())
+    )
+    await session.commit()
+    return result.rowcount > 0
+
+
+async def release_proposal_job(
+    session: AsyncSession,
+    id: int,
+    worker_id: str,
+    requeue: bool = False,
+):
+    values = {"locked_at": None, "locked_by": None}
+    if requeue:
+        values["status"] = "queue"
+    await session.execute(
+        update(models.ProposalJob)
+        .where(
+            models.ProposalJob.id == id,
+            models.ProposalJob.locked_by == worker_id,
+        )
+        .values(**values)
+    )
+    await session.commit()
+
+
+async def park_proposal_job(
+    session: AsyncSession,
+    pj: models.ProposalJob,
+    delay_seconds: float,
+):
+    """Put a job back on the queue, not claimable for `delay_seconds`. The
+    attempt is not counted against job_max_attempts."""
+    pj.status = "queue"
+    pj.scheduled_at = datetime.datetime.now() + datetime.timedelta(
+        seconds=delay_seconds
+    )
+    pj.locked_at = None
+    pj.locked_by = None
+    pj.attempts = max(pj.attempts - 1, 0)
+    session.add(pj)
+    await session.commit()
+
+
+async def fail_proposal_job(
+    session: AsyncSession,
+    id: int,
+    error_message: str,
+):
     pj = await get_proposal_job_by_id(session, id)
-    if pj:
-        pj.status = status
-        pj.total_failed_file = 0
-        pj.total_uploaded_file = 0
-        pj.is_error = False
-        pj.error_message = None
-        session.add(pj)
-        await session.commit()
-        await session.refresh(pj)
-        return pj
-    return None
+    if not pj:
+        return
+    pj.status = "completed"
+    pj.completed_at = datetime.datetime.now()
+    pj.is_error = True
+    pj.error_message = error_message
+    pj.locked_at = None
+    pj.locked_by = None
+    session.add(pj)
+    await session.execute(
+        update(models.Proposal)
+        .where(models.Proposal.id == pj.proposal_id)
+        .values(
+            status="failed",
+            artifact_version=func.coalesce(models.Proposal.artifact_version, 0) + 1,
+        )
+    )
+    await session.commit()
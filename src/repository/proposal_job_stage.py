@@ -0,0 +1,70 @@
+import datetime
+import json
+from typing import Any, Dict, Optional
+from sqlalchemy import select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import models
+
+
+async def get_completed_stage_outputs(
+    session: AsyncSession,
+    job_id: int,
+) -> Dict[str, Any]:
+    qProposalJobStage = select(
+        models.ProposalJobStage.stage,
+        models.ProposalJobStage.output,
+    ).where(
+        models.ProposalJobStage.job_id == job_id,
+        models.ProposalJobStage.status == "completed",
+        models.ProposalJobStage.output.is_not(None),
+    )
+    rProposalJobStage = await session.execute(qProposalJobStage)
+    return {row.stage: json.loads(row.output) for row in rProposalJobStage}
+
+
+async def save_stage_checkpoint(
+    session: AsyncSession,
+    job_id: int,
+    stage: str,
+    status: str,
+    output: Any = None,
+    error_message: Optional[str] = None,
+):
+    now = datetime.datetime.now()
+    values = {
+        "status": status,
+        "output": json.dumps(output) if output is not None else None,
+        "error_message": error_message,
+        "updated_at": now,
+    }
+    if status == "running":
+        values["started_at"] = now
+        values["completed_at"] = None
+    else:
+        values["completed_at"] = now
+
+    qUpsert = (
+        insert(models.ProposalJobStage)
+        .values(job_id=job_id, stage=stage, created_at=now, **values)
+        .on_conflict_do_update(
+            index_elements=[
+                models.ProposalJobStage.job_id,
+                models.ProposalJobStage.stage,
+            ],
+            set_=values,
+        )
+    )
+    await session.execute(qUpsert)
+    await session.commit()
+
+
+async def clear_stage_outputs(session: AsyncSession, job_id: int):
+    # Timings and statuses stay for inspection; the payloads are only needed
+    # to resume a failed job.
+    await session.execute(
+        update(models.ProposalJobStage)
+        .where(models.ProposalJobStage.job_id == job_id)
+        .values(output=None)
+    )
@@ -1,5 +1,6 @@
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import load_only
 
 from app import models
 
@@ -8,8 +9,18 @@ async def get_proposal_overlap_by_id(
     session: AsyncSession,
     id: int,
 ) -> models.ProposalScoreOverlap:
-    qProposalScoreOverlap = select(models.ProposalScoreOverlap).where(
-        models.ProposalScoreOverlap.id == id
+    # Only what the attachment download needs.
+    qProposalScoreOverlap = (
+        select(models.ProposalScoreOverlap)
+        .options(
+            load_only(
+                models.ProposalScoreOverlap.rincian_output,
+                models.ProposalScoreOverlap.content_sha256,
+                models.ProposalScoreOverlap.content_size,
+                models.ProposalScoreOverlap.content_type,
+            )
+        )
+        .where(models.ProposalScoreOverlap.id == id)
     )
     rProposalScoreOverlap = await session.execute(qProposalScoreOverlap)
     return rProposalScoreOverlap.scalars().first()
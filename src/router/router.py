@@ -6,6 +6,7 @@ from src.controller.proposal import router as proposal_router
 from src.controller.job import router as job_router
 from src.controller.kro import router as kro_router
 from src.controller.proposal_overlap import router as proposal_overlap_router
+from src.controller.reference import router as reference_router
 
 
 apirouter = APIRouter()
@@ -24,3 +25,4 @@ apirouter.include_router(
     proposal_overlap_router,
     dependencies=[Depends(with_x_api_key)],
 )
+apirouter.include_router(reference_router, dependencies=[Depends(with_x_api_key)])
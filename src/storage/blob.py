@@ -0,0 +1,263 @@
+import asyncio
+import hashlib
+import os
+import tempfile
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import AsyncIterator, Iterable, List, Optional
+
+from app.config import settings
+
+
+@dataclass(frozen=True)
+class StoredBlob:
+    sha256: str
+    size: int
+
+
+class BlobWriter(ABC):
+    """Receives a blob chunk by chunk, hashing it as it goes.
+
+    Use as ``async with store.writer() as writer``; an exception inside the
+    block discards what was written.
+    """
+
+    @abstractmethod
+    async def write(self, chunk: bytes):
+        raise NotImplementedError
+
+    @abstractmethod
+    async def commit(self) -> StoredBlob:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def abort(self):
+        raise NotImplementedError
+
+    async def __aenter__(self) -> "BlobWriter":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            await self.abort()
+
+
+class BlobStore(ABC):
+    """Content-addressed storage for document bytes, keyed by SHA-256.
+
+    Writing the same bytes twice stores them once. Backends only have to
+    provide a writer, existence checks and ranged reads; `local_path` lets
+    the HTTP layer hand a file to the server for sendfile when the backend
+    keeps blobs on a local disk.
+    """
+
+    @abstractmethod
+    def writer(self) -> BlobWriter:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def exists(self, sha256: str) -> bool:
+        raise NotImplementedError
+
+    @abstractmethod
+    def iter_range(
+        self,
+        sha256: str,
+        start: int = 0,
+        end: Optional[int] = None,
+        chunk_size: Optional[int] = None,
+    ) -> AsyncIterator[bytes]:
+        """Bytes ``start`` up to (excluding) ``end`` of the blob."""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def delete(self, sha256: str, older_than: Optional[float] = None):
+        """Remove a blob; no error when it is already gone. With
+        `older_than`, a blob written again since then is kept."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def list_blobs(self, older_than: float) -> AsyncIterator[str]:
+        """Hashes of the blobs last written before `older_than` (a Unix
+        timestamp). Writing content that is already stored counts as a
+        write, so a blob about to be referenced again is not listed."""
+        raise NotImplementedError
+
+    async def purge_partial_writes(self, older_than: float) -> int:
+        """Drop writes left unfinished (e.g. by a killed process) before
+        `older_than`; returns how many."""
+        return 0
+
+    def local_path(self, sha256: str) -> Optional[str]:
+        return None
+
+    def relative_path(self, sha256: str) -> str:
+        return f"{sha256[:2]}/{sha256[2:4]}/{sha256}"
+
+
+class LocalBlobWriter(BlobWriter):
+    def __init__(self, store: "LocalBlobStore"):
+        self.store = store
+        self.digest = hashlib.sha256()
+        self.size = 0
+        self._file = None
+        self._tmp_path = None
+
+    def _open(self):
+        tmp_dir = os.path.join(self.store.root, "tmp")
+        os.makedirs(tmp_dir, exist_ok=True)
+        fd, self._tmp_path = tempfile.mkstemp(dir=tmp_dir)
+        self._file = os.fdopen(fd, "wb")
+
+    async def write(self, chunk: bytes):
+        if self._file is None:
+            await asyncio.to_thread(self._open)
+        self.digest.update(chunk)
+        self.size += len(chunk)
+        await asyncio.to_thread(self._file.write, chunk)
+
+    def _finish(self, sha256: str):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        path = self.store.local_path(sha256)
+        if os.path.exists(path):
+            # Same content already stored (content addressing dedupes it).
+            # Touched so the unreferenced-blob sweep treats it as new.
+            os.unlink(self._tmp_path)
+            os.utime(path)
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(self._tmp_path, path)
+
+    async def commit(self) -> StoredBlob:
+        if self._file is None:
+            await asyncio.to_thread(self._open)
+        sha256 = self.digest.hexdigest()
+        await asyncio.to_thread(self._finish, sha256)
+        self._file = None
+        return StoredBlob(sha256=sha256, size=self.size)
+
+    def _discard(self):
+        self._file.close()
+        os.unlink(self._tmp_path)
+
+    async def abort(self):
+        if self._file is not None:
+            await asyncio.to_thread(self._discard)
+            self._file = None
+
+
+class LocalBlobStore(BlobStore):
+    """Blobs as files under `root`, fanned out as ``ab/cd/abcd...``.
+
+    The API writes the uploads and the workers read them, so with workers
+    on other nodes `root` must be a volume they all mount (NFS or similar)
+    until a shared backend exists.
+    """
+
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+
+    def writer(self) -> BlobWriter:
+        return LocalBlobWriter(self)
+
+    def local_path(self, sha256: str) -> str:
+        return os.path.join(self.root, self.relative_path(sha256))
+
+    async def exists(self, sha256: str) -> bool:
+        return await asyncio.to_thread(os.path.exists, self.local_path(sha256))
+
+    def _delete(self, sha256: str, older_than: Optional[float]):
+        path = self.local_path(sha256)
+        try:
+            if older_than is None or os.stat(path).st_mtime < older_than:
+                os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+    async def delete(self, sha256: str, older_than: Optional[float] = None):
+        await asyncio.to_thread(self._delete, sha256, older_than)
+
+    def _list_blobs(self, older_than: float) -> List[str]:
+        hashes = []
+        for directory, subdirectories, files in os.walk(self.root):
+            if directory == self.root:
+                subdirectories[:] = [name for name in subdirectories if name != "tmp"]
+            for name in files:
+                try:
+                    mtime = os.stat(os.path.join(directory, name)).st_mtime
+                except FileNotFoundError:
+                    continue
+                if mtime < older_than:
+                    hashes.append(name)
+        return hashes
+
+    async def list_blobs(self, older_than: float) -> AsyncIterator[str]:
+        for sha256 in await asyncio.to_thread(self._list_blobs, older_than):
+            yield sha256
+
+    def _purge_partial_writes(self, older_than: float) -> int:
+        tmp_dir = os.path.join(self.root, "tmp")
+        if not os.path.isdir(tmp_dir):
+            return 0
+        purged = 0
+        for name in os.listdir(tmp_dir):
+            path = os.path.join(tmp_dir, name)
+            try:
+                if os.stat(path).st_mtime < older_than:
+                    os.unlink(path)
+                    purged += 1
+            except FileNotFoundError:
+                continue
+        return purged
+
+    async def purge_partial_writes(self, older_than: float) -> int:
+        return await asyncio.to_thread(self._purge_partial_writes, older_than)
+
+    async def iter_range(
+        self,
+        sha256: str,
+        start: int = 0,
+        end: Optional[int] = None,
+        chunk_size: Optional[int] = None,
+    ) -> AsyncIterator[bytes]:
+        chunk_size = chunk_size or settings.blob_chunk_size
+        f = await asyncio.to_thread(open, self.local_path(sha256), "rb")
+        try:
+            await asyncio.to_thread(f.seek, start)
+            remaining = None if end is None else end - start
+            while remaining is None or remaining > 0:
+                size = chunk_size if remaining is None else min(chunk_size, remaining)
+                chunk = await asyncio.to_thread(f.read, size)
+                if not chunk:
+                    break
+                if remaining is not None:
+                    remaining -= len(chunk)
+                yield chunk
+        finally:
+            await asyncio.to_thread(f.close)
+
+
+async def put_chunks(store: BlobStore, chunks: Iterable[bytes]) -> StoredBlob:
+    async with store.writer() as writer:
+        for chunk in chunks:
+            await writer.write(chunk)
+        return await writer.commit()
+
+
+async def put_bytes(store: BlobStore, data: bytes) -> StoredBlob:
+    view = memoryview(data)
+    size = settings.blob_chunk_size
+    return await put_chunks(
+        store, (view[start : start + size] for start in range(0, len(view), size))
+    )
+
+
+def create_blob_store() -> BlobStore:
+    if settings.blob_store_backend == "local":
+        return LocalBlobStore(settings.blob_store_path)
+    raise ValueError(f"Unknown BLOB_STORE_BACKEND {settings.blob_store_backend!r}")
+
+
+blob_store = create_blob_store()
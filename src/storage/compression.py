@@ -0,0 +1,188 @@
+import gzip
+import importlib
+import importlib.util
+import logging
+import zlib
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional
+
+from app.config import settings
+
+logger = logging.getLogger("api-compression")
+
+
+class Compressor(ABC):
+    """Streaming compressor; every `compress` call returns output that can
+    be decoded up to that point (sync flush), so streamed responses reach
+    the client chunk by chunk."""
+
+    @abstractmethod
+    def compress(self, data: bytes) -> bytes:
+        raise NotImplementedError
+
+    @abstractmethod
+    def finish(self) -> bytes:
+        raise NotImplementedError
+
+
+class Codec(ABC):
+    name: str
+
+    @abstractmethod
+    def compress(self, data: bytes) -> bytes:
+        raise NotImplementedError
+
+    @abstractmethod
+    def compressor(self) -> Compressor:
+        raise NotImplementedError
+
+
+class _GzipCompressor(Compressor):
+    def __init__(self, level: int):
+        self._obj = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._obj.compress(data) + self._obj.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._obj.flush()
+
+
+class GzipCodec(Codec):
+    name = "gzip"
+
+    def __init__(self, level: int):
+        self.level = level
+
+    def compress(self, data: bytes) -> bytes:
+        return gzip.compress(data, self.level, mtime=0)
+
+    def compressor(self) -> Compressor:
+        return _GzipCompressor(self.level)
+
+
+class _BrotliCompressor(Compressor):
+    def __init__(self, brotli, quality: int):
+        self._obj = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._obj.process(data) + self._obj.flush()
+
+    def finish(self) -> bytes:
+        return self._obj.finish()
+
+
+class BrotliCodec(Codec):
+    name = "br"
+
+    def __init__(self, quality: int):
+        self.brotli = importlib.import_module("brotli")
+        self.quality = quality
+
+    def compress(self, data: bytes) -> bytes:
+        return self.brotli.compress(data, quality=self.quality)
+
+    def compressor(self) -> Compressor:
+        return _BrotliCompressor(self.brotli, self.quality)
+
+
+class _ZstdCompressor(Compressor):
+    def __init__(self, zstandard, level: int):
+        self._flush_block = zstandard.COMPRESSOBJ_FLUSH_BLOCK
+        self._obj = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._obj.compress(data) + self._obj.flush(self._flush_block)
+
+    def finish(self) -> bytes:
+        return self._obj.flush()
+
+
+class ZstdCodec(Codec):
+    name = "zstd"
+
+    def __init__(self, level: int):
+        self.zstandard = importlib.import_module("zstandard")
+        self.level = level
+
+    def compress(self, data: bytes) -> bytes:
+        return self.zstandard.ZstdCompressor(level=self.level).compress(data)
+
+    def compressor(self) -> Compressor:
+        return _ZstdCompressor(self.zstandard, self.level)
+
+
+# Optional codecs and the package they need (pip install .[compression]).
+_OPTIONAL = {"br": "brotli", "zstd": "zstandard"}
+
+
+def create_codecs() -> Dict[str, Codec]:
+    """The codecs of COMPRESSION_ENCODINGS, in server preference order."""
+    codecs: Dict[str, Codec] = {}
+    for name in settings.compression_encodings:
+        package = _OPTIONAL.get(name)
+        if package and importlib.util.find_spec(package) is None:
+            logger.warning(f"{name} compression needs {package}, skipping it")
+            continue
+        if name == "gzip":
+            codecs[name] = GzipCodec(settings.compression_gzip_level)
+        elif name == "br":
+            codecs[name] = BrotliCodec(settings.compression_brotli_quality)
+        elif name == "zstd":
+            codecs[name] = ZstdCodec(settings.compression_zstd_level)
+        else:
+            raise ValueError(f"Unknown compression encoding {name!r}")
+    return codecs
+
+
+codecs = create_codecs()
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """Best of our codecs for an Accept-Encoding header: highest q value,
+    ties broken by server preference. None when nothing is acceptable."""
+    if not accept_encoding:
+        return None
+    weights: Dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                continue
+        weights[name.strip().lower()] = q
+
+    best, best_q = None, 0.0
+    for name in codecs:
+        q = weights.get(name, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = name, q
+    return best
+
+
+def is_compressible(content_type: str) -> bool:
+    media_type = content_type.split(";")[0].strip().lower()
+    return media_type.startswith(tuple(settings.compression_media_types))
+
+
+def precompress(body: bytes) -> Dict[str, bytes]:
+    """`body` in every available encoding, for bodies cached in memory."""
+    if len(body) < settings.compression_minimum_size:
+        return {}
+    return {name: codec.compress(body) for name, codec in codecs.items()}
+
+
+def weak_etag(etag: str) -> str:
+    # A compressed body is a different byte sequence than the one the
+    # strong ETag was computed for.
+    return etag if etag.startswith("W/") else f"W/{etag}"
+
+
+def add_vary(vary: Optional[str]) -> str:
+    values: List[str] = [v.strip() for v in vary.split(",")] if vary else []
+    if not any(v.lower() == "accept-encoding" for v in values):
+        values.append("Accept-Encoding")
+    return ", ".join(values)
@@ -0,0 +1,172 @@
+import mimetypes
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import Request
+from python_multipart.exceptions import MultipartParseError
+from python_multipart.multipart import MultipartParser, parse_options_header
+
+from src.storage.blob import BlobStore, BlobWriter
+
+
+class MultipartError(Exception):
+    pass
+
+
+class UploadTooLargeError(Exception):
+    pass
+
+
+@dataclass
+class _Part:
+    headers: Dict[bytes, bytes] = field(default_factory=dict)
+    name: str = ""
+    filename: Optional[str] = None
+    content_type: Optional[str] = None
+    size: int = 0
+    data: bytearray = field(default_factory=bytearray)
+    writer: Optional[BlobWriter] = None
+
+
+async def receive_multipart(
+    request: Request,
+    store: BlobStore,
+    max_file_size: int,
+    max_request_size: int,
+    max_field_size: int = 64 * 1024,
+    max_files: int = 100,
+) -> Tuple[Dict[str, List[str]], Dict[str, List[dict]]]:
+    """Parse a multipart/form-data body while it arrives.
+
+    File parts are written to `store` chunk by chunk (hashed on the way)
+    instead of being spooled and copied, so memory stays flat whatever the
+    upload size. The size caps are enforced as the bytes come in: the
+    request is rejected with UploadTooLargeError as soon as a file or the
+    whole body goes over its limit. Returns (fields, files) where every
+    file is described by the document columns of its stored blob.
+    """
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit():
+        if int(content_length) > max_request_size:
+            raise UploadTooLargeError(f"Request body exceeds {max_request_size} bytes")
+
+    _, params = parse_options_header(request.headers.get("content-type", ""))
+    boundary = params.get(b"boundary")
+    if not boundary:
+        raise MultipartError("Missing boundary in multipart/form-data")
+
+    # python-multipart calls back synchronously; events are queued and
+    # handled (with awaits) after every chunk fed to the parser.
+    events: List[tuple] = []
+    header_name = bytearray()
+    header_value = bytearray()
+
+    def on_header_field(data: bytes, start: int, end: int):
+        header_name.extend(data[start:end])
+
+    def on_header_value(data: bytes, start: int, end: int):
+        header_value.extend(data[start:end])
+
+    def on_header_end():
+        events.append(("header", bytes(header_name).lower(), bytes(header_value)))
+        header_name.clear()
+        header_value.clear()
+
+    parser = MultipartParser(
+        boundary,
+        {
+            "on_part_begin": lambda: events.append(("begin",)),
+            "on_header_field": on_header_field,
+            "on_header_value": on_header_value,
+            "on_header_end": on_header_end,
+            "on_headers_finished": lambda: events.append(("headers",)),
+            "on_part_data": lambda data, start, end: events.append(
+                ("data", data[start:end])
+            ),
+            "on_part_end": lambda: events.append(("end",)),
+        },
+    )
+
+    fields: Dict[str, List[str]] = {}
+    files: Dict[str, List[dict]] = {}
+    part = _Part()
+    received = 0
+    file_count = 0
+
+    try:
+        async for chunk in request.stream():
+            received += len(chunk)
+            if received > max_request_size:
+                raise UploadTooLargeError(
+                    f"Request body exceeds {max_request_size} bytes"
+                )
+            parser.write(chunk)
+
+            for event in events:
+                kind = event[0]
+                if kind == "begin":
+                    part = _Part()
+                elif kind == "header":
+                    part.headers[event[1]] = event[2]
+                elif kind == "headers":
+                    _, options = parse_options_header(
+                        part.headers.get(b"content-disposition", b"")
+                    )
+                    if b"name" not in options:
+                        raise MultipartError("Multipart part without a name")
+                    part.name = options[b"name"].decode("utf-8", "replace")
+                    if b"filename" in options:
+                        file_count += 1
+                        if file_count > max_files:
+                            raise MultipartError(f"More than {max_files} files")
+                        part.filename = options[b"filename"].decode("utf-8", "replace")
+                        part.content_type = (
+                            part.headers.get(b"content-type", b"").decode("latin-1")
+                            or None
+                        )
+                        part.writer = store.writer()
+                elif kind == "data":
+                    part.size += len(event[1])
+                    if part.writer is not None:
+                        if part.size > max_file_size:
+                            raise UploadTooLargeError(
+                                f"{part.filename} exceeds {max_file_size} bytes"
+                            )
+                        await part.writer.write(event[1])
+                    else:
+                        if part.size > max_field_size:
+                            raise MultipartError(
+                                f"Field {part.name} exceeds {max_field_size} bytes"
+                            )
+                        part.data.extend(event[1])
+                elif kind == "end":
+                    if part.writer is None:
+                        fields.setdefault(part.name, []).append(
+                            part.data.decode("utf-8", "replace")
+                        )
+                    elif not part.filename and not part.size:
+                        # An empty optional file input.
+                        await part.writer.abort()
+                    else:
+                        blob = await part.writer.commit()
+                        files.setdefault(part.name, []).append(
+                            {
+                                "file_name": part.filename,
+                                "content_sha256": blob.sha256,
+                                "content_size": blob.size,
+                                "content_type": part.content_type
+                                or mimetypes.guess_type(part.filename)[0]
+                                or "application/octet-stream",
+                            }
+                        )
+                    part.writer = None
+            events.clear()
+        parser.finalize()
+    except BaseException as exc:
+        if part.writer is not None:
+            await part.writer.abort()
+        if isinstance(exc, MultipartParseError):
+            raise MultipartError(str(exc)) from exc
+        raise
+
+    return fields, files
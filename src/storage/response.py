@@ -0,0 +1,104 @@
+import re
+from typing import Optional, Tuple
+from urllib.parse import quote
+
+from fastapi import Request
+from fastapi.responses import FileResponse, Response, StreamingResponse
+
+from app.config import settings
+from src.storage.blob import blob_store
+
+_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return etag in tags
+
+
+def parse_single_range(range_header: str, size: int) -> Optional[Tuple[int, int]]:
+    """(start, end) with `end` exclusive, None when the header is not a
+    single byte range we serve; ValueError when it cannot be satisfied."""
+    match = _RANGE.match(range_header.strip())
+    if not match or match.groups() == ("", ""):
+        return None
+    first, last = match.groups()
+    if first == "":
+        start, end = max(size - int(last), 0), size
+    else:
+        start = int(first)
+        end = min(int(last) + 1, size) if last else size
+    if start >= size or start >= end:
+        raise ValueError(range_header)
+    return start, end
+
+
+def blob_response(
+    request: Request,
+    sha256: str,
+    size: int,
+    content_type: Optional[str],
+    filename: str,
+) -> Response:
+    """Download response for a blob without reading it into the app.
+
+    The ETag is the content hash, so If-None-Match answers 304 without
+    touching the blob. nginx serves the file (sendfile) when
+    BLOB_ACCEL_REDIRECT_PREFIX is set; otherwise a local blob goes out as a
+    FileResponse (pathsend/sendfile, Range and If-Range support) and other
+    backends are streamed with single-range support.
+    """
+    media_type = content_type or "application/pdf"
+    etag = f'"{sha256}"'
+    cache_headers = {"ETag": etag, "Cache-Control": settings.blob_cache_control}
+    headers = {
+        **cache_headers,
+        "Content-Disposition": f"attachment; filename*=utf-8''{quote(filename)}",
+    }
+
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=cache_headers)
+
+    if settings.blob_accel_redirect_prefix:
+        location = settings.blob_accel_redirect_prefix.rstrip("/")
+        return Response(
+            media_type=media_type,
+            headers={
+                **headers,
+                "X-Accel-Redirect": f"{location}/{blob_store.relative_path(sha256)}",
+            },
+        )
+
+    path = blob_store.local_path(sha256)
+    if path:
+        return FileResponse(path, media_type=media_type, headers=headers)
+
+    start, end, status_code = 0, size, 200
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (if_range is None or if_range.strip() == etag):
+        try:
+            byte_range = parse_single_range(range_header, size)
+        except ValueError:
+            return Response(
+                status_code=416, headers={"Content-Range": f"bytes */{size}"}
+            )
+        if byte_range:
+            start, end = byte_range
+            status_code = 206
+            headers["Content-Range"] = f"bytes {start}-{end - 1}/{size}"
+
+    return StreamingResponse(
+        blob_store.iter_range(sha256, start, end),
+        status_code=status_code,
+        media_type=media_type,
+        headers={
+            **headers,
+            "Accept-Ranges": "bytes",
+            "Content-Length": str(end - start),
+        },
+    )
@@ -0,0 +1,50 @@
+import logging
+import time
+
+from app.db import AsyncSessionLocal
+from src.repository.blob import get_referenced_blobs
+from src.storage.blob import BlobStore
+
+logger = logging.getLogger("blob-sweep")
+
+_BATCH_SIZE = 200
+
+
+async def sweep_unreferenced_blobs(store: BlobStore, grace_seconds: int) -> int:
+    """Delete blobs no row references, e.g. the files of an upload rejected
+    after some parts were stored (413/422) or whose insert failed.
+
+    Only blobs untouched for `grace_seconds` are considered, so a blob
+    whose row is still being written (an upload in progress, an overlap
+    attachment before its checkpoint) is never removed. Returns how many
+    blobs were deleted.
+    """
+    older_than = time.time() - grace_seconds
+    purged = await store.purge_partial_writes(older_than)
+    if purged:
+        logger.info(f"Removed {purged} unfinished blob write(s)")
+
+    deleted = 0
+    batch = []
+    async for sha256 in store.list_blobs(older_than):
+        batch.append(sha256)
+        if len(batch) >= _BATCH_SIZE:
+            deleted += await _delete_unreferenced(store, batch, older_than)
+            batch = []
+    if batch:
+        deleted += await _delete_unreferenced(store, batch, older_than)
+    if deleted:
+        logger.info(f"Removed {deleted} unreferenced blob(s)")
+    return deleted
+
+
+async def _delete_unreferenced(
+    store: BlobStore, hashes: list, older_than: float
+) -> int:
+    async with AsyncSessionLocal() as session:
+        referenced = await get_referenced_blobs(session, hashes)
+    unreferenced = [sha256 for sha256 in hashes if sha256 not in referenced]
+    for sha256 in unreferenced:
+        # Skipped if an upload of the same content touched it meanwhile.
+        await store.delete(sha256, older_than=older_than)
+    return len(unreferenced)
@@ -0,0 +1,61 @@
+import datetime
+
+from app import models
+from src.constant.globals import USER_ID
+from src.repository import proposal
+
+
+async def create_proposal_with_jobs(session, job_count: int):
+    jb = models.JenisBelanja(label="Belanja Barang")
+    sjb = models.SubJenisBelanja(label="Belanja Barang Operasional", jenis_belanja=jb)
+    pr = models.Proposal(
+        user_id=USER_ID,
+        jenis_belanja=jb,
+        sub_jenis_belanja=sjb,
+        status="completed",
+    )
+    session.add_all([jb, sjb, pr])
+    await session.flush()
+
+    created_at = datetime.datetime(2025, 1, 1)
+    jobs = [
+        models.ProposalJob(
+            proposal_id=pr.id,
+            status="completed",
+            created_at=created_at + datetime.timedelta(minutes=index),
+        )
+        for index in range(job_count)
+    ]
+    session.add_all(jobs)
+    await session.commit()
+    return pr, jobs
+
+
+async def test_list_returns_one_row_per_proposal_with_latest_job(session):
+    pr, jobs = await create_proposal_with_jobs(session, 3)
+
+    rows, next_cursor = await proposal.get_list_proposal(session, limit=10)
+
+    assert [row["id"] for row in rows] == [pr.id]
+    assert rows[0]["runtime_id"] == jobs[-1].id
+    assert next_cursor is None
+
+
+async def test_list_prefers_the_recorded_runtime_id(session):
+    pr, jobs = await create_proposal_with_jobs(session, 3)
+    pr.runtime_id = jobs[0].id
+    await session.commit()
+
+    rows, _ = await proposal.get_list_proposal(session, limit=10)
+
+    assert [row["id"] for row in rows] == [pr.id]
+    assert rows[0]["runtime_id"] == jobs[0].id
+
+
+async def test_detail_returns_the_active_job(session):
+    pr, jobs = await create_proposal_with_jobs(session, 3)
+
+    row = await proposal.get_proposal_detail_by_id(session, pr.id)
+
+    assert row["id"] == pr.id
+    assert row["runtime_id"] == jobs[-1].id
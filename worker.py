@@ -0,0 +1,35 @@
+import asyncio
+import logging
+import signal
+
+from prometheus_client import start_http_server
+from app.config import settings
+from app.db import engine, warm_up_pool
+from src.agent.client import agent_client
+from src.metrics.agent import register_agent_metrics
+from src.pipeline.worker import run_worker
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+
+
+async def main():
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    if settings.worker_metrics_port:
+        register_agent_metrics()
+        start_http_server(settings.worker_metrics_port)
+    await warm_up_pool()
+    await agent_client.start()
+    try:
+        await run_worker(stop)
+    finally:
+        await agent_client.close()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())